@@ -1,20 +1,40 @@
 # from .utils import download_grid_data
 from .parse import parse_affil, parse_email, parse_zipcode
-import re
+from .parse import load_institution_abbreviations, load_multiple_campus
+from .parse import location_cache_stats, clear_location_cache, warm, load_zip_cities
+from .parse import set_location_priority
+from .parse import use_world_gazetteer, find_world_city
+from .parse import set_work_budget, truncated_records, use_known_institutions
+from .budget import WorkBudget
+from .tokenizer import tokenize_affil
+from .batch import AffiliationColumns, parse_affil_columns, parse_affil_many
+from .batch import cache_stats, set_cache_size, iter_parse_multiple, SubAffiliation
+from .disk_cache import DiskCache
+from .frame import parse_frame, parse_arrow, parse_partitions
+
+# exports importing multiprocessing are loaded on first access
+_LAZY_EXPORTS = {
+    "ParallelParser": "parallel",
+    "parse_affil_parallel": "parallel",
+    "iter_affiliations": "medline",
+    "parse_medline_file": "medline",
+    "parse_medline_directory": "medline",
+    "share_data": "shared",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        from importlib import import_module
+
+        return getattr(import_module("." + _LAZY_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def multiple_match_affil(text):
-    email = parse_email(text)
-    zip_code = parse_zipcode(text)
-    text = re.sub(email, "", text)
-    text = re.sub(zip_code, "", text)
-    results = []
-    for t in re.split('\;|\.', text):
-        if t.strip() == "":
-            continue
-        result = parse_affil(t)
-        results.append(result)
-        # for af in result:
-        #     results.append(af)
-    # results = sorted(results, key=lambda x: x['score'], reverse=True)
-    return results
\ No newline at end of file
+    """
+    Parse a string listing several affiliations separated by ``;`` or
+    ``.``, return one result per affiliation (see ``iter_parse_multiple``
+    to stream them with their character spans)
+    """
+    return [part.result for part in iter_parse_multiple(text, use_cache=False)]
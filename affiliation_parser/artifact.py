@@ -0,0 +1,438 @@
+"""
+Prebuilt binary data artifact with the bundled tables, loaded with mmap
+
+Build it after changing the CSV files or ``keywords.py``
+
+    python -m affiliation_parser.artifact [output path]
+"""
+import array
+import bisect
+from collections import defaultdict
+import csv
+import hashlib
+import io
+import logging
+import mmap
+import os
+import struct
+import sys
+import zlib
+from functools import lru_cache
+from typing import *
+from . import keywords
+from .disk_cache import data_fingerprint
+
+logger = logging.getLogger(__name__)
+
+root_path = os.path.abspath(os.path.dirname(__file__))
+DEFAULT_PATH = os.path.join(root_path, "data", "affiliation_data.bin")
+MAGIC = b"AFFPDATA"
+FORMAT_VERSION = 5
+# written in native byte order, checked when loading
+BYTE_ORDER = 0x01020304
+HEADER = struct.Struct("=8sII32sI")
+SECTION = struct.Struct("=47scQQ")
+ALIGN = 8
+# node_rank of trie nodes that end no city
+NO_RANK = 0xFFFFFFFF
+CITY_FILE = "uscities_trimmed.csv"
+CSV_TABLES = ("uscities_trimmed", "grid", "hospital_npi")
+# keyword tables of keywords.py read from the artifact, see load_keyword_table
+KEYWORD_TABLES = ("COUNTRY", "DEPARMENT", "INSTITUTE", "REMOVE_INSTITUE", "STATES", "STATE_MAP")
+
+
+class StringTable:
+    """
+    Interned strings stored as one UTF-8 blob plus end offsets, decoded on
+    access
+    """
+
+    def __init__(self, offsets: memoryview, data: memoryview):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, i: int) -> str:
+        start = self.offsets[i - 1] if i else 0
+        return str(self.data[start:self.offsets[i]], "utf-8")
+
+    def encoded(self, i: int) -> bytes:
+        start = self.offsets[i - 1] if i else 0
+        return self.data[start:self.offsets[i]].tobytes()
+
+
+class ArtifactBuilder:
+    """
+    Collect interned strings and typed arrays and write them as one file
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.sections = {}
+
+    def intern(self, value: str) -> int:
+        i = self.ids.get(value)
+        if i is None:
+            i = self.ids[value] = len(self.ids)
+        return i
+
+    def add(self, name: str, typecode: str, values: Iterable):
+        self.sections[name] = array.array(typecode, values)
+
+    def add_rows(self, name: str, rows: Iterable[Sequence[str]]):
+        """
+        Add ragged table of string rows as ``name.offsets`` (end offset of
+        each row) and ``name.values`` (string ids)
+        """
+        offsets = array.array("I")
+        values = array.array("I")
+        for row in rows:
+            values.extend(self.intern(value) for value in row)
+            offsets.append(len(values))
+        self.sections[name + ".offsets"] = offsets
+        self.sections[name + ".values"] = values
+
+    def write(self, fp, fingerprint: str):
+        """
+        Write artifact to binary file object
+        """
+        strings = [value.encode("utf-8") for value in self.ids]
+        offsets = array.array("I")
+        end = 0
+        for value in strings:
+            end += len(value)
+            offsets.append(end)
+        sections = dict(self.sections)
+        sections["strings.offsets"] = offsets
+        sections["strings.data"] = array.array("B", b"".join(strings))
+
+        position = HEADER.size + SECTION.size * len(sections)
+        directory = []
+        for name, values in sections.items():
+            position += -position % ALIGN
+            size = len(values) * values.itemsize
+            directory.append((name, values.typecode, position, size))
+            position += size
+        fp.write(HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER, fingerprint.encode(), len(sections)))
+        written = HEADER.size
+        for name, typecode, offset, size in directory:
+            written += fp.write(SECTION.pack(name.encode(), typecode.encode(), offset, size))
+        for (name, typecode, offset, size), values in zip(directory, sections.values()):
+            written += fp.write(b"\0" * (offset - written))
+            written += fp.write(values.tobytes())
+        return written
+
+    def to_bytes(self, fingerprint: str) -> bytes:
+        fp = io.BytesIO()
+        self.write(fp, fingerprint)
+        return fp.getvalue()
+
+
+def source_paths() -> List[str]:
+    """
+    Paths relative to the package of the files an artifact is built from
+    """
+    return [os.path.join("data", name + ".csv") for name in CSV_TABLES] + ["keywords.py"]
+
+
+def _digest(path: str) -> str:
+    with open(path, "rb") as fp:
+        return hashlib.sha256(fp.read()).hexdigest()
+
+
+def _keyword_rows(table) -> List[Tuple[str, ...]]:
+    if isinstance(table, dict):
+        return sorted(table.items())
+    rows = [row if isinstance(row, tuple) else (row,) for row in table]
+    # sets have no stable order
+    return sorted(rows) if isinstance(table, (set, frozenset)) else rows
+
+
+def source_stamps() -> List[Tuple[str, str, str, str]]:
+    """
+    ``(path, size, mtime_ns, sha256)`` of the files an artifact is built
+    from, recorded when building it
+    """
+    stamps = []
+    for name in source_paths():
+        path = os.path.join(root_path, name)
+        stat = os.stat(path)
+        stamps.append((name, str(stat.st_size), str(stat.st_mtime_ns), _digest(path)))
+    return stamps
+
+
+def sources_unchanged(stamps: Iterable[Sequence[str]]) -> bool:
+    """
+    Whether the source files still match their recorded stamps. A file of
+    the same size and modification time is taken as unchanged, otherwise
+    its content is hashed, so copies (``cp -r``, installed packages) with
+    new modification times still match.
+    """
+    stamps = list(stamps)
+    if [stamp[0] for stamp in stamps] != source_paths():
+        return False
+    for name, size, mtime_ns, digest in stamps:
+        path = os.path.join(root_path, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if str(stat.st_size) != size:
+            return False
+        if str(stat.st_mtime_ns) != mtime_ns and _digest(path) != digest:
+            return False
+    return True
+
+
+def _gazetteer_sections(builder: ArtifactBuilder, names, states, population):
+    """
+    Token trie of city names as flat arrays, see ``FlatCityGazetteer``
+    """
+    tokens = {}
+    children = [{}]
+    node_city = [0]
+    node_rank = [NO_RANK]
+    node_population = [0.0]
+    node_states = [set()]
+    for row, (name, state, pop) in enumerate(zip(names, states, population)):
+        words = name.split()
+        # names with commas can never match tokenized text
+        if not words or "," in name:
+            continue
+        node = 0
+        for word in words:
+            token = tokens.setdefault(word, len(tokens))
+            child = children[node].get(token)
+            if child is None:
+                child = children[node][token] = len(children)
+                children.append({})
+                node_city.append(0)
+                node_rank.append(NO_RANK)
+                node_population.append(0.0)
+                node_states.append(set())
+            node = child
+        if not node_city[node]:
+            node_city[node] = builder.intern(" ".join(words)) + 1
+            node_rank[node] = row
+        # same as us_city_pop_map, the last row of a name wins
+        node_population[node] = pop
+        node_states[node].add(state)
+
+    # open addressing hash table of token bytes, crc32 is stable across processes
+    size = 1 << (2 * len(tokens) - 1).bit_length()
+    slots = array.array("I", bytes(4 * size))
+    for token, index in tokens.items():
+        slot = zlib.crc32(token.encode("utf-8")) & (size - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (size - 1)
+        slots[slot] = index + 1
+    builder.add("gazetteer.token_strings", "I", map(builder.intern, tokens))
+    builder.add("gazetteer.token_slots", "I", slots)
+
+    child_offsets = array.array("I", [0])
+    edge_token = array.array("I")
+    edge_child = array.array("I")
+    for edges in children:
+        for token in sorted(edges):
+            edge_token.append(token)
+            edge_child.append(edges[token])
+        child_offsets.append(len(edge_token))
+    builder.sections["gazetteer.child_offsets"] = child_offsets
+    builder.sections["gazetteer.edge_token"] = edge_token
+    builder.sections["gazetteer.edge_child"] = edge_child
+    builder.add("gazetteer.node_city", "I", node_city)
+    builder.add("gazetteer.node_rank", "I", node_rank)
+    builder.add("gazetteer.node_population", "d", node_population)
+
+    state_keys = sorted(set(states))
+    state_index = {state: i for i, state in enumerate(state_keys)}
+    builder.add("gazetteer.states", "I", map(builder.intern, state_keys))
+    state_offsets = array.array("I", [0])
+    state_values = array.array("I")
+    for node in node_states:
+        state_values.extend(sorted(state_index[state] for state in node))
+        state_offsets.append(len(state_values))
+    builder.sections["gazetteer.state_offsets"] = state_offsets
+    builder.sections["gazetteer.node_states"] = state_values
+
+
+def compile_artifact() -> ArtifactBuilder:
+    """
+    Collect the bundled CSV files and keyword tables into an artifact
+    builder
+    """
+    builder = ArtifactBuilder()
+    data_path = os.path.join(root_path, "data")
+    builder.add_rows("sources", source_stamps())
+    for name in CSV_TABLES:
+        with open(os.path.join(data_path, name + ".csv"), encoding="utf-8", newline="") as fp:
+            builder.add_rows("csv." + name, csv.reader(fp))
+    for name in KEYWORD_TABLES:
+        builder.add_rows("keywords." + name, _keyword_rows(getattr(keywords, name)))
+
+    # U.S. cities in file order (by population) with indexes by name and state
+    names, states, population = [], [], []
+    with open(os.path.join(data_path, CITY_FILE), encoding="utf-8", newline="") as fp:
+        reader = csv.reader(fp)
+        next(reader)
+        for row in reader:
+            names.append(row[0].upper().strip().replace(".", ""))
+            states.append(row[1])
+            population.append(float(row[2]))
+    builder.add("cities.name", "I", map(builder.intern, names))
+    builder.add("cities.state", "I", map(builder.intern, states))
+    builder.add("cities.population", "d", population)
+    builder.add("cities.by_name", "I", sorted(range(len(names)), key=lambda i: (names[i], i)))
+    by_state = sorted(range(len(names)), key=lambda i: (states[i], i))
+    state_keys = sorted(set(states))
+    builder.add("cities.by_state", "I", by_state)
+    builder.add("cities.state_keys", "I", map(builder.intern, state_keys))
+    builder.add("cities.state_offsets", "I", (
+        bisect.bisect_right([states[i] for i in by_state], state) for state in state_keys
+    ))
+    _gazetteer_sections(builder, names, states, population)
+    return builder
+
+
+def build_artifact(path: str = DEFAULT_PATH, fingerprint: Optional[str] = None) -> str:
+    """
+    Compile the bundled CSV files and keyword tables into a binary artifact
+    at ``path``
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fp:
+        compile_artifact().write(fp, fingerprint or data_fingerprint())
+    os.replace(tmp_path, path)
+    return path
+
+
+class DataArtifact:
+    """
+    Read-only view of a binary data artifact.
+
+    The file is memory-mapped and sections are exposed as typed
+    ``memoryview`` arrays over the mapping, nothing is copied or parsed at
+    load time. Pages are read on demand and shared by all processes mapping
+    the same file. ``buffer`` can be given instead of ``path`` to read an
+    artifact held in memory, e.g. a shared memory block.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_PATH, buffer=None):
+        self.path = path
+        if buffer is None:
+            with open(path, "rb") as fp:
+                buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = buffer
+        self.view = view = memoryview(buffer)
+        magic, version, byte_order, fingerprint, n_sections = HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION or byte_order != BYTE_ORDER:
+            raise ValueError(f"{path or 'buffer'} is not a compatible affiliation_parser data artifact")
+        self.fingerprint = fingerprint.rstrip(b"\0").decode()
+        self.sections = {}
+        for i in range(n_sections):
+            name, typecode, offset, size = SECTION.unpack_from(view, HEADER.size + i * SECTION.size)
+            section = view[offset:offset + size]
+            self.sections[name.rstrip(b"\0").decode()] = section.cast(typecode.decode())
+        self.strings = StringTable(self.sections["strings.offsets"], self.sections["strings.data"])
+
+    def __contains__(self, name: str):
+        return name in self.sections
+
+    def array(self, name: str) -> memoryview:
+        return self.sections[name]
+
+    def rows(self, name: str) -> Iterator[Tuple[str, ...]]:
+        """
+        Iterate rows of a ragged string table, e.g. ``"csv.grid"`` or
+        ``"keywords.COUNTRY"``
+        """
+        offsets = self.sections[name + ".offsets"]
+        values = self.sections[name + ".values"]
+        strings = self.strings
+        start = 0
+        for end in offsets:
+            yield tuple(strings[i] for i in values[start:end])
+            start = end
+
+    def column(self, name: str, index: int) -> Iterator[str]:
+        """
+        Iterate field ``index`` of each row of a ragged string table, only
+        that field is decoded, "" for rows without it
+        """
+        offsets = self.sections[name + ".offsets"]
+        values = self.sections[name + ".values"]
+        strings = self.strings
+        start = 0
+        for end in offsets:
+            yield strings[values[start + index]] if start + index < end else ""
+            start = end
+
+    def city(self, name: str) -> List[Tuple[str, float]]:
+        """
+        Return ``(state, population)`` of every U.S. city called ``name``
+        by binary search in the name index
+        """
+        names = self.sections["cities.name"]
+        by_name = self.sections["cities.by_name"]
+        strings = self.strings
+        key = name.upper().strip().replace(".", "")
+        lo = bisect.bisect_left(range(len(by_name)), key, key=lambda k: strings[names[by_name[k]]])
+        found = []
+        while lo < len(by_name) and strings[names[by_name[lo]]] == key:
+            row = by_name[lo]
+            found.append((strings[self.sections["cities.state"][row]],
+                          self.sections["cities.population"][row]))
+            lo += 1
+        return found
+
+    def us_cities(self):
+        """
+        Return cities ordered by population, city population map and state
+        abbreviation to cities map, as ``data_processor.load_us_cities``
+        """
+        strings = self.strings
+        cities = [strings[i] for i in self.sections["cities.name"]]
+        pop_map = dict(zip(cities, self.sections["cities.population"]))
+        state_map = defaultdict(set)
+        by_state = self.sections["cities.by_state"]
+        start = 0
+        for state, end in zip(self.sections["cities.state_keys"], self.sections["cities.state_offsets"]):
+            state_map[strings[state]] = {cities[row] for row in by_state[start:end]}
+            start = end
+        return cities, pop_map, state_map
+
+    def close(self):
+        # views must be released before the mapping can be closed
+        for section in self.sections.values():
+            section.release()
+        self.sections.clear()
+        self.strings = None
+        self.view.release()
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+
+@lru_cache(maxsize=None)
+def load_artifact(path: str = DEFAULT_PATH) -> Optional[DataArtifact]:
+    """
+    Return the data artifact at ``path`` if it exists and was built from
+    the current data files, otherwise None, see ``sources_unchanged``
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        artifact = DataArtifact(path)
+    except (ValueError, struct.error) as e:
+        logger.warning("ignoring data artifact: %s", e)
+        return None
+    if not sources_unchanged(artifact.rows("sources")):
+        logger.warning("data artifact %s is out of date, rebuild it with "
+                       "python -m affiliation_parser.artifact", path)
+        return None
+    return artifact
+
+
+if __name__ == "__main__":
+    print(build_artifact(*sys.argv[1:2]))
@@ -0,0 +1,120 @@
+"""
+Aho-Corasick keyword automaton used to find many keywords in a single scan
+"""
+from collections import deque
+from typing import *
+
+
+class KeywordAutomaton:
+    """
+    Multi-pattern substring matcher.
+
+    Keywords are added with a label, the automaton is compiled once with
+    ``build`` and then scanned over text in time proportional to the length
+    of the text, independent of the number of keywords.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._own = [()]
+        self._out = [()]
+        self._built = True
+        self.size = 0
+
+    @classmethod
+    def from_keywords(cls, keywords: Dict[str, Iterable[str]]):
+        """
+        Build automaton from a mapping of label to keyword collection
+        """
+        automaton = cls()
+        for label, words in keywords.items():
+            for word in sorted(words):
+                automaton.add(word, label)
+        return automaton.build()
+
+    def add(self, keyword: str, label: Hashable = None):
+        """
+        Add keyword with its label to the automaton
+        """
+        if not keyword:
+            return self
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append(())
+                self._out.append(())
+            state = nxt
+        entry = (len(keyword), label, keyword)
+        if entry not in self._own[state]:
+            self._own[state] = self._own[state] + (entry,)
+            self.size += 1
+        self._built = False
+        return self
+
+    def build(self):
+        """
+        Compute failure links and merge outputs along them
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        out[:] = self._own
+        queue = deque()
+        for nxt in goto[0].values():
+            fail[nxt] = 0
+            queue.append(nxt)
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                # keep own outputs first so longer keywords come first
+                out[nxt] = out[nxt] + tuple(o for o in out[fail[nxt]] if o not in out[nxt])
+        self._built = True
+        return self
+
+    def iter_matches(self, text: str):
+        """
+        Yield ``(start, end, keyword, label)`` for every keyword occurrence
+        in text, including overlapping ones
+        """
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                end = i + 1
+                for length, label, keyword in out[state]:
+                    yield end - length, end, keyword, label
+
+    def labels(self, text: str) -> Set[Hashable]:
+        """
+        Return the set of labels of keywords found in text
+        """
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for _, label, _ in out[state]:
+                    found.add(label)
+        return found
+
+    def __len__(self):
+        return self.size
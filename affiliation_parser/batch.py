@@ -0,0 +1,292 @@
+"""
+Batch parsing of affiliation strings into columnar output
+"""
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from itertools import islice
+import re
+from typing import *
+from .cache import LRUCache
+from .disk_cache import DiskCache, input_key
+from .parse import cache_namespace, config_version, parse_affil, select_fields
+from .result import FIELDS, ParsedAffiliation
+from .tokenizer import EMAIL, ZIPCODE, tokenize_affil
+
+# fields holding a list of strings per record
+LIST_FIELDS = frozenset(["department", "institution"])
+
+# results of recently parsed strings, shared across batches, keyed by
+# (text, fields, parser configuration version)
+RESULT_CACHE = LRUCache(maxsize=100000)
+BATCH_STATS = {"records": 0, "parsed": 0}
+
+# one affiliation of a string listing several, ``start`` and ``end`` are
+# character offsets in the source string
+SubAffiliation = namedtuple("SubAffiliation", ["start", "end", "text", "result"])
+sub_affiliation_re = re.compile(r"[^;.]+")
+
+
+class AffiliationColumns:
+    """
+    Struct-of-arrays result of parsing many affiliation strings.
+
+    Every scalar field is a list with one value per record. List fields
+    (``department``, ``institution``) are stored as one flat list of values
+    plus an offsets list with ``len + 1`` entries: the values of record ``i``
+    are ``values[offsets[i]:offsets[i + 1]]``. The columns keep no
+    per-record result object, only the field values.
+    """
+
+    def __init__(self, fields: Optional[Iterable[str]] = None):
+        fields = select_fields(fields)
+        self.fields = tuple(f for f in FIELDS if fields is None or f in fields)
+        self.columns = {f: [] for f in self.fields if f not in LIST_FIELDS}
+        self.values = {f: [] for f in self.fields if f in LIST_FIELDS}
+        self.offsets = {f: [0] for f in self.fields if f in LIST_FIELDS}
+        self.size = 0
+
+    def append(self, result: Mapping):
+        """
+        Append one parsed result
+        """
+        for field, column in self.columns.items():
+            column.append(result[field])
+        for field, values in self.values.items():
+            values.extend(result[field])
+            self.offsets[field].append(len(values))
+        self.size += 1
+
+    def extend(self, results: Iterable[Mapping]):
+        for result in results:
+            self.append(result)
+        return self
+
+    def __len__(self):
+        return self.size
+
+    def column(self, field: str) -> list:
+        """
+        Return column of field, list fields as one list per record
+        """
+        if field in self.columns:
+            return self.columns[field]
+        values, offsets = self.values[field], self.offsets[field]
+        return [values[offsets[i]:offsets[i + 1]] for i in range(self.size)]
+
+    def row(self, i: int) -> ParsedAffiliation:
+        """
+        Return record ``i`` as ``ParsedAffiliation``
+        """
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        result = ParsedAffiliation()
+        for field, column in self.columns.items():
+            setattr(result, field, column[i])
+        for field, values in self.values.items():
+            offsets = self.offsets[field]
+            setattr(result, field, values[offsets[i]:offsets[i + 1]])
+        return result
+
+    def __iter__(self):
+        return (self.row(i) for i in range(self.size))
+
+    def to_pandas(self, index=None):
+        """
+        Return columns as a pandas DataFrame. Scalar column lists are handed
+        to pandas as they are, strings are shared and not copied. List fields
+        become object columns holding one list per record, sliced from the
+        flat values here; ``to_arrow`` keeps them flat.
+        """
+        import pandas as pd
+
+        data = {f: self.column(f) for f in self.fields}
+        return pd.DataFrame(data, index=index, columns=list(self.fields))
+
+    def to_arrow(self):
+        """
+        Return columns as a pyarrow Table, list fields become list<string>
+        columns built directly from the flat values and offsets
+        """
+        import pyarrow as pa
+
+        arrays = []
+        for field in self.fields:
+            if field in self.columns:
+                arrays.append(pa.array(self.columns[field], type=pa.string()))
+            else:
+                arrays.append(pa.ListArray.from_arrays(
+                    pa.array(self.offsets[field], type=pa.int32()),
+                    pa.array(self.values[field], type=pa.string()),
+                ))
+        return pa.Table.from_arrays(arrays, names=list(self.fields))
+
+
+def _parse_batch(affil_texts: List[str], fields, cache, use_cache, disk_cache):
+    """
+    Parse list of strings, each distinct string once, checking the LRU cache
+    and then the disk cache before parsing
+    """
+    resolved = {}
+    missing = []
+    version = config_version()
+    for affil_text in dict.fromkeys(affil_texts):
+        result = cache.get((affil_text, fields, version)) if use_cache else None
+        if result is None:
+            missing.append(affil_text)
+        else:
+            resolved[affil_text] = result
+    not_cached = missing
+
+    namespace = cache_namespace("parse_affil")
+    if disk_cache is not None and missing:
+        keys = {affil_text: input_key(affil_text, fields) for affil_text in missing}
+        found = disk_cache.get_many(namespace, keys.values())
+        still_missing = []
+        for affil_text in missing:
+            value = found.get(keys[affil_text])
+            if value is None:
+                still_missing.append(affil_text)
+            else:
+                resolved[affil_text] = ParsedAffiliation(**value)
+        missing = still_missing
+
+    parsed = []
+    for affil_text in missing:
+        result = parse_affil(affil_text, fields=fields)
+        resolved[affil_text] = result
+        parsed.append(affil_text)
+    BATCH_STATS["records"] += len(affil_texts)
+    BATCH_STATS["parsed"] += len(parsed)
+
+    if disk_cache is not None and parsed:
+        # partial results depend on the work budget, they are not persisted
+        disk_cache.put_many(namespace, (
+            (keys[affil_text], resolved[affil_text].to_dict()) for affil_text in parsed
+            if not resolved[affil_text].truncated
+        ))
+    if use_cache:
+        for affil_text in not_cached:
+            cache.put((affil_text, fields, version), resolved[affil_text])
+    return [resolved[affil_text] for affil_text in affil_texts]
+
+
+def iter_parse_affil(affil_texts: Iterable[str], fields: Optional[Iterable[str]] = None,
+                     cache: Optional[LRUCache] = None, use_cache: bool = True,
+                     batch_size: Optional[int] = 10000, disk_cache: Optional[DiskCache] = None):
+    """
+    Yield parsed results for affiliation strings in input order.
+
+    Input is processed in batches of ``batch_size`` records (the whole input
+    if None). Within a batch every distinct string is parsed once, after
+    looking it up in the LRU ``cache`` (``RESULT_CACHE`` by default) and then
+    in the optional persistent ``disk_cache``, with one query per batch.
+    Results of identical strings are the same object, copy a result before
+    modifying it.
+    """
+    fields = select_fields(fields)
+    cache = RESULT_CACHE if cache is None else cache
+    affil_texts = iter(affil_texts)
+    while True:
+        batch = list(islice(affil_texts, batch_size))
+        if not batch:
+            return
+        yield from _parse_batch(batch, fields, cache, use_cache, disk_cache)
+        if batch_size is None:
+            return
+
+
+def parse_affil_many(affil_texts: Iterable[str], fields: Optional[Iterable[str]] = None,
+                     cache: Optional[LRUCache] = None, use_cache: bool = True,
+                     disk_cache: Optional[DiskCache] = None) -> List[ParsedAffiliation]:
+    """
+    Parse a batch of affiliation strings, identical strings in the batch are
+    parsed once and recent results are reused across batches
+    """
+    return list(iter_parse_affil(affil_texts, fields, cache, use_cache, None, disk_cache))
+
+
+def parse_affil_columns(affil_texts: Iterable[str], fields: Optional[Iterable[str]] = None,
+                        cache: Optional[LRUCache] = None, use_cache: bool = False,
+                        disk_cache: Optional[DiskCache] = None) -> AffiliationColumns:
+    """
+    Parse many affiliation strings straight into ``AffiliationColumns``.
+
+    Distinct strings are parsed once per batch of 10000 records and their
+    results are dropped once their values are appended. The LRU ``cache`` is not used unless ``use_cache``
+    is set, then results are looked up in and kept in it as in
+    ``parse_affil_many``.
+    """
+    fields = select_fields(fields)
+    columns = AffiliationColumns(fields)
+    return columns.extend(iter_parse_affil(affil_texts, fields, cache, use_cache, disk_cache=disk_cache))
+
+
+def _source_offsets(tokens):
+    """
+    Return function mapping offsets in ``tokens.full_text`` to offsets in
+    the tokenized text, which still holds the removed email and zip code
+    """
+    cuts = []
+    shifts = []
+    shift = 0
+    for span in tokens.spans:
+        if span.kind in (EMAIL, ZIPCODE):
+            cuts.append(span.start - shift)
+            shift += span.end - span.start
+            shifts.append(shift)
+
+    def source(offset: int, end: bool = False) -> int:
+        # text removed at the end offset of a piece belongs to the next one
+        i = bisect_left(cuts, offset) if end else bisect_right(cuts, offset)
+        return offset + (shifts[i - 1] if i else 0)
+
+    return source
+
+
+def iter_parse_multiple(text: str, fields: Optional[Iterable[str]] = None,
+                        cache: Optional[LRUCache] = None, use_cache: bool = True):
+    """
+    Yield a ``SubAffiliation`` for each affiliation of a string listing
+    several, separated by ``;`` or ``.``, as ``multiple_match_affil`` splits
+    them.
+
+    The email and zip code of the whole string are found and removed in one
+    pass before splitting, and each piece is parsed when the consumer asks
+    for it. Pieces repeat across records (consortium author lists), their
+    results are looked up in the LRU ``cache`` (``RESULT_CACHE`` by
+    default) and are shared objects, copy a result before modifying it.
+    """
+    fields = select_fields(fields)
+    cache = RESULT_CACHE if cache is None else cache
+    tokens = tokenize_affil(text)
+    source = _source_offsets(tokens)
+    version = config_version()
+    for match in sub_affiliation_re.finditer(tokens.full_text):
+        piece = match.group()
+        if piece.strip() == "":
+            continue
+        result = cache.get((piece, fields, version)) if use_cache else None
+        if result is None:
+            result = parse_affil(piece, fields=fields)
+            if use_cache:
+                cache.put((piece, fields, version), result)
+        yield SubAffiliation(source(match.start()), source(match.end(), end=True), piece, result)
+
+
+def cache_stats() -> dict:
+    """
+    Return number of records and parses done by the batch functions and the
+    result cache hit, miss and eviction counts
+    """
+    stats = dict(BATCH_STATS)
+    stats.update(RESULT_CACHE.stats())
+    return stats
+
+
+def set_cache_size(maxsize: int):
+    """
+    Resize the shared result cache, 0 disables it
+    """
+    RESULT_CACHE.resize(maxsize)
@@ -0,0 +1,60 @@
+"""
+Per-record work budget of parse_affil for very long affiliation strings
+"""
+from collections import Counter, deque
+import logging
+from typing import *
+
+logger = logging.getLogger(__name__)
+
+# reasons a record is truncated
+LENGTH = "length"
+SEGMENTS = "segments"
+CITY_CANDIDATES = "city_candidates"
+
+
+class WorkBudget:
+    """
+    Limits on the work spent on one record.
+
+    Text longer than ``max_length`` characters is cut at the last segment
+    separator before the limit, only the first ``max_segments`` segments
+    are tagged and searched for a location, and only the first
+    ``max_city_candidates`` cities found in a text are compared. A record
+    hitting any limit gets a partial result with ``truncated`` set, and the
+    last ``report_size`` of them are kept in ``records`` as
+    ``(text, reasons)``. None disables a limit.
+    """
+
+    def __init__(self, max_length: Optional[int] = 5000, max_segments: Optional[int] = 100,
+                 max_city_candidates: Optional[int] = 50, report_size: int = 1000):
+        self.max_length = max_length
+        self.max_segments = max_segments
+        self.max_city_candidates = max_city_candidates
+        self.records = deque(maxlen=report_size)
+        self.counts = Counter()
+
+    def cut(self, text: str) -> str:
+        """
+        Return text within ``max_length``, cut after a whole segment when
+        possible
+        """
+        if self.max_length is None or len(text) <= self.max_length:
+            return text
+        end = max(
+            text.rfind(separator, 0, self.max_length + len(separator)) for separator in (", ", "; ")
+        )
+        return text[:end] if end > 0 else text[:self.max_length]
+
+    def report(self, text: str, reasons: Iterable[str]):
+        reasons = tuple(sorted(reasons))
+        self.records.append((text, reasons))
+        self.counts["records"] += 1
+        self.counts.update(reasons)
+        logger.debug("truncated record of %d characters (%s)", len(text), ", ".join(reasons))
+
+    def stats(self) -> dict:
+        """
+        Return number of truncated records, in total and by reason
+        """
+        return {reason: self.counts[reason] for reason in ("records", LENGTH, SEGMENTS, CITY_CANDIDATES)}
@@ -0,0 +1,213 @@
+"""
+Command line interface for bulk parsing of affiliation strings
+
+    python -m affiliation_parser affiliations.csv --column affiliation > parsed.jsonl
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import sys
+import time
+from collections import deque
+from typing import *
+from .result import FIELDS
+
+INPUT_FORMATS = ("text", "csv", "tsv", "jsonl")
+OUTPUT_FORMATS = ("jsonl", "csv")
+
+
+def open_input(path: str):
+    """
+    Open text file for reading, ``-`` is stdin and ``.gz`` files are
+    decompressed on the fly
+    """
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def guess_format(path: str) -> str:
+    """
+    Input format from file extension, plain text lines if unknown
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    for ext, fmt in ((".csv", "csv"), (".tsv", "tsv"), (".jsonl", "jsonl"), (".json", "jsonl")):
+        if name.endswith(ext):
+            return fmt
+    return "text"
+
+
+def read_records(fp, fmt: str, column: Optional[str] = None, id_column: Optional[str] = None):
+    """
+    Yield ``(id, affiliation)`` from an input stream, ``id`` is the value of
+    ``id_column`` or the record number. ``column`` defaults to the first
+    column of CSV/TSV and to ``affiliation`` for JSONL.
+    """
+    if fmt == "text":
+        for i, line in enumerate(fp):
+            yield i, line.rstrip("\r\n")
+    elif fmt in ("csv", "tsv"):
+        reader = csv.DictReader(fp, delimiter="," if fmt == "csv" else "\t")
+        column = column or (reader.fieldnames or [None])[0]
+        for name in (column, id_column or column):
+            if name not in (reader.fieldnames or ()):
+                raise ValueError(f"Column {name!r} not in input columns {reader.fieldnames}")
+        for i, row in enumerate(reader):
+            yield row[id_column] if id_column else i, row[column] or ""
+    elif fmt == "jsonl":
+        column = column or "affiliation"
+        for i, line in enumerate(fp):
+            if line.strip():
+                record = json.loads(line)
+                yield record.get(id_column) if id_column else i, record.get(column) or ""
+    else:
+        raise ValueError(f"Unknown input format {fmt!r}, expected any of {INPUT_FORMATS}")
+
+
+class Writer:
+    """
+    Write results one record at a time as JSON lines or CSV rows, list
+    fields are joined with ``"; "`` in CSV
+    """
+
+    def __init__(self, fp, fmt: str, fields: Sequence[str], id_column: Optional[str] = None):
+        self.fp = fp
+        self.fmt = fmt
+        self.fields = fields
+        self.id_column = id_column
+        if fmt == "csv":
+            self.writer = csv.writer(fp)
+            self.writer.writerow(([id_column] if id_column else []) + list(fields))
+        elif fmt != "jsonl":
+            raise ValueError(f"Unknown output format {fmt!r}, expected any of {OUTPUT_FORMATS}")
+
+    def write(self, record_id, result):
+        if self.fmt == "jsonl":
+            record = {self.id_column: record_id} if self.id_column else {}
+            record.update((f, result[f]) for f in self.fields)
+            self.fp.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            row = [record_id] if self.id_column else []
+            for f in self.fields:
+                value = result[f]
+                row.append("; ".join(value) if isinstance(value, list) else value)
+            self.writer.writerow(row)
+
+
+class Progress:
+    """
+    Report processed records and throughput on stderr
+    """
+
+    def __init__(self, every: float = 5.0, stream=sys.stderr):
+        self.every = every
+        self.stream = stream
+        self.count = 0
+        self.start = self.last = time.perf_counter()
+
+    def update(self, n: int = 1):
+        self.count += n
+        now = time.perf_counter()
+        if self.every and now - self.last >= self.every:
+            self.last = now
+            self.report(now)
+
+    def report(self, now: Optional[float] = None):
+        elapsed = (now or time.perf_counter()) - self.start
+        rate = self.count / elapsed if elapsed else 0.0
+        print(f"{self.count} records, {elapsed:.1f}s, {rate:.0f} records/s",
+              file=self.stream, flush=True)
+
+
+def parse_records(records: Iterable[Tuple[Any, str]], fields=None, workers: int = 1,
+                  batch_size: int = 10000):
+    """
+    Yield ``(id, result)`` in input order. Only the records in flight are
+    held in memory.
+    """
+    ids = deque()
+
+    def texts():
+        for record_id, affil_text in records:
+            ids.append(record_id)
+            yield affil_text
+
+    if workers > 1:
+        from .parallel import ParallelParser
+
+        with ParallelParser(workers, fields, max_chunk_size=batch_size) as parser:
+            for result in parser.imap(texts()):
+                yield ids.popleft(), result
+    else:
+        from .batch import iter_parse_affil
+
+        for result in iter_parse_affil(texts(), fields, batch_size=batch_size):
+            yield ids.popleft(), result
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="affiliation_parser",
+        description="Parse affiliation strings from a file or stdin into JSON lines or CSV",
+    )
+    parser.add_argument("input", nargs="?", default="-",
+                        help="input file, .gz is decompressed, default stdin")
+    parser.add_argument("-o", "--output", default="-", help="output file, default stdout")
+    parser.add_argument("-f", "--format", choices=INPUT_FORMATS,
+                        help="input format, guessed from file extension by default")
+    parser.add_argument("-t", "--output-format", choices=OUTPUT_FORMATS, default="jsonl")
+    parser.add_argument("-c", "--column",
+                        help="column holding the affiliation, default first CSV/TSV column "
+                             "or 'affiliation' in JSONL")
+    parser.add_argument("--id-column", help="input column copied to the output as record id")
+    parser.add_argument("--fields", help=f"comma separated output fields from {','.join(FIELDS)}")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("-b", "--batch-size", type=int, default=10000,
+                        help="records parsed per batch or worker chunk")
+    parser.add_argument("--progress", type=float, default=0.0, metavar="SECONDS",
+                        help="report progress on stderr every SECONDS")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    from .parse import select_fields
+
+    try:
+        fields = select_fields(args.fields.split(",") if args.fields else None)
+    except ValueError as e:
+        parser.error(str(e))
+    output_fields = [f for f in FIELDS if fields is None or f in fields]
+    fmt = args.format or guess_format(args.input)
+    progress = Progress(args.progress)
+
+    fp_in = open_input(args.input)
+    fp_out = sys.stdout if args.output == "-" else open(
+        args.output, "w", encoding="utf-8", newline=""
+    )
+    try:
+        writer = Writer(fp_out, args.output_format, output_fields, args.id_column)
+        records = read_records(fp_in, fmt, args.column, args.id_column)
+        for record_id, result in parse_records(records, fields, args.workers, args.batch_size):
+            writer.write(record_id, result)
+            progress.update()
+        fp_out.flush()
+    except ValueError as e:
+        # bad input column or malformed record
+        parser.error(str(e))
+    except BrokenPipeError:
+        # output closed early, e.g. piped into head
+        sys.stderr.close()
+        return 1
+    finally:
+        fp_in.close()
+        if fp_out is not sys.stdout:
+            fp_out.close()
+    if args.progress:
+        progress.report()
+    return 0
@@ -3,6 +3,7 @@ Handle loading data files into dicts, other usable formats
 """
 from collections import defaultdict
 import csv
+from functools import lru_cache
 import logging
 from typing import *
 from .keywords import *
@@ -13,38 +14,51 @@ logger = logging.getLogger(__name__)
 TOP1000_CITIES = 'uscities_trimmed.csv'
 fn = __file__
 root_path = os.path.abspath(os.path.dirname(__file__))
-logger.warning(root_path)
 
-def us_cities():
+
+@lru_cache(maxsize=None)
+def load_us_cities() -> Tuple[List[str], Dict[str, float], Dict[str, Set[str]]]:
+    """
+    Read city data file once and return cities ordered by population, city
+    population map and state abbreviation to cities map. Uses the prebuilt
+    data artifact when it is up to date.
+    """
+    from .artifact import load_artifact
+
+    artifact = load_artifact()
+    if artifact is not None:
+        return artifact.us_cities()
     cities = []
+    city_pop_map = {}
+    cities_map = defaultdict(set)
+    states = set(STATE_MAP.values())
     try:
         # Load city data
         with open(root_path + '/data/' + TOP1000_CITIES, encoding='utf-8') as fp:
             r = csv.reader(fp)
             next(r)
             for row in r:
-                cities.append(row[0].upper().strip().replace(".", ""))
+                city = row[0].upper().strip().replace(".", "")
+                state_id = row[1]
+                if state_id not in states:
+                    raise ValueError(
+                        f"Unrecognized state abbreviation: {state_id}")
+                cities.append(city)
+                city_pop_map[city] = float(row[2])
+                cities_map[state_id].add(city)
     except Exception as e:
         logger.error("Unable to load city information.")
         raise e
+    logger.debug("loaded %d US cities", len(cities))
+    return cities, city_pop_map, cities_map
+
 
-    return cities
+def us_cities():
+    return list(load_us_cities()[0])
 
 
 def us_city_pop_map():
-    city_pop_map = {}
-    try:
-        # Load city data
-        with open(root_path + '/data/' + TOP1000_CITIES, encoding='utf-8') as fp:
-            r = csv.reader(fp)
-            next(r)
-            for row in r:
-                city_pop_map[row[0].upper().strip().replace(
-                    ".", "")] = float(row[2])
-    except Exception as e:
-        logger.error("Unable to load city information.")
-
-    return city_pop_map
+    return dict(load_us_cities()[1])
 
 
 def us_state_cities_map() -> Dict[str, Set[str]]:
@@ -52,19 +66,46 @@ def us_state_cities_map() -> Dict[str, Set[str]]:
     Map state abbreviations to the cities within them.
     """
     cities_map = defaultdict(set)
-    try:
-        # Load city data
-        with open(root_path + '/data/' + TOP1000_CITIES, encoding='utf-8') as fp:
-            r=csv.reader(fp)
-            next(r)
-            for row in r:
-                city=row[0].upper().strip().replace(".", "")
-                state_id=row[1]
-                if state_id not in STATE_MAP.values():
-                    raise ValueError(
-                        f"Unrecognized state abbreviation: {state_id}")
-                cities_map[state_id].add(city)
-    except Exception as e:
-        logger.error("Unable to load city information.")
-
+    for state_id, cities in load_us_cities()[2].items():
+        cities_map[state_id].update(cities)
     return cities_map
+
+
+def load_institution_names(table: str) -> List[str]:
+    """
+    Return the ``institution`` column of a bundled table, ``"grid"`` or
+    ``"hospital_npi"``, read from the data artifact when it is up to date
+    """
+    from .artifact import load_artifact
+
+    artifact = load_artifact()
+    if artifact is not None:
+        # decode the one column only
+        index = next(artifact.rows("csv." + table)).index("institution")
+        names = artifact.column("csv." + table, index)
+        next(names)
+        return [name for name in names if name]
+    with open(os.path.join(root_path, "data", table + ".csv"), encoding="utf-8", newline="") as fp:
+        rows = csv.reader(fp)
+        index = next(rows).index("institution")
+        return [row[index] for row in rows if len(row) > index and row[index]]
+
+
+def load_keyword_table(name: str):
+    """
+    Return keyword table ``name`` of ``keywords.py``, e.g. ``"COUNTRY"``,
+    read from the data artifact when it is up to date and holds it
+    """
+    from . import keywords
+    from .artifact import load_artifact
+
+    table = getattr(keywords, name)
+    artifact = load_artifact()
+    if artifact is None or f"keywords.{name}.offsets" not in artifact:
+        return table
+    rows = artifact.rows("keywords." + name)
+    if isinstance(table, dict):
+        return dict(rows)
+    if isinstance(table, (set, frozenset)):
+        return frozenset(row[0] for row in rows)
+    return tuple(rows)
@@ -0,0 +1,147 @@
+"""
+Persistent SQLite cache of parse results keyed by input hash and data version
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from typing import *
+
+root_path = os.path.abspath(os.path.dirname(__file__))
+# bump when parsing code changes the output for the same data
+PARSER_VERSION = "1"
+_FINGERPRINT = None
+
+
+def data_fingerprint() -> str:
+    """
+    Hash of the parser version, ``keywords.py`` and the bundled data files,
+    any change to them gives a new fingerprint
+    """
+    global _FINGERPRINT
+    if _FINGERPRINT is None:
+        digest = hashlib.sha256(PARSER_VERSION.encode())
+        paths = [os.path.join(root_path, "keywords.py")]
+        data_path = os.path.join(root_path, "data")
+        paths += sorted(
+            os.path.join(data_path, f) for f in os.listdir(data_path) if f.endswith(".csv")
+        )
+        for path in paths:
+            digest.update(os.path.basename(path).encode())
+            with open(path, "rb") as fp:
+                for block in iter(lambda: fp.read(1 << 20), b""):
+                    digest.update(block)
+        _FINGERPRINT = digest.hexdigest()[:32]
+    return _FINGERPRINT
+
+
+def input_key(text: str, fields: Optional[Iterable[str]] = None) -> bytes:
+    """
+    Hash of the stripped input text and requested fields
+    """
+    digest = hashlib.blake2b(text.strip().encode("utf-8"), digest_size=16)
+    if fields is not None:
+        digest.update(b"\0" + ",".join(sorted(fields)).encode())
+    return digest.digest()
+
+
+def _json_default(value):
+    # numpy scalars in match_affil results
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class DiskCache:
+    """
+    Parse results stored in a local SQLite file.
+
+    Entries are keyed by namespace (e.g. ``"parse_affil"``) and the hash of
+    the input. The file records the ``data_fingerprint`` it was written with;
+    opening it after ``keywords.py`` or the data files changed drops all
+    entries. Results parsed under a changed runtime configuration (loaded
+    abbreviations, known institutions, ...) are stored under a namespace
+    carrying ``parse.config_fingerprint()``. Lookups and inserts take whole
+    batches and run as one query or transaction per batch.
+    """
+
+    # stay below SQLite's limit on bound parameters per statement
+    chunk_size = 500
+
+    def __init__(self, path: str, fingerprint: Optional[str] = None):
+        self.path = path
+        self.fingerprint = fingerprint or data_fingerprint()
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "namespace TEXT, key BLOB, value TEXT, PRIMARY KEY (namespace, key)"
+                ") WITHOUT ROWID"
+            )
+            row = self.connection.execute(
+                "SELECT value FROM meta WHERE name = 'fingerprint'"
+            ).fetchone()
+            if row is None or row[0] != self.fingerprint:
+                self.connection.execute("DELETE FROM results")
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (self.fingerprint,)
+                )
+
+    def get_many(self, namespace: str, keys: Iterable[bytes]) -> Dict[bytes, Any]:
+        """
+        Return cached values found for keys
+        """
+        keys = list(keys)
+        found = {}
+        for i in range(0, len(keys), self.chunk_size):
+            chunk = keys[i:i + self.chunk_size]
+            rows = self.connection.execute(
+                "SELECT key, value FROM results WHERE namespace = ? AND key IN (%s)"
+                % ",".join("?" * len(chunk)),
+                [namespace, *chunk],
+            )
+            for key, value in rows:
+                found[key] = json.loads(value)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, namespace: str, items: Iterable[Tuple[bytes, Any]]):
+        """
+        Store ``(key, value)`` pairs in one transaction
+        """
+        rows = [
+            (namespace, key, json.dumps(value, separators=(",", ":"), default=_json_default))
+            for key, value in items
+        ]
+        if rows:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?)", rows
+                )
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self)}
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM results")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
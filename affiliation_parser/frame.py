@@ -0,0 +1,73 @@
+"""
+Parse affiliation columns of pandas DataFrames and Arrow tables a whole
+partition at a time
+"""
+from typing import *
+from .batch import AffiliationColumns, parse_affil_columns
+from .cache import LRUCache
+
+
+def _texts(values: Iterable) -> Iterator[str]:
+    # missing values (None, NaN) parse as empty strings
+    return (value if isinstance(value, str) else "" for value in values)
+
+
+def _parse_column(values: Iterable, fields, cache) -> AffiliationColumns:
+    return parse_affil_columns(_texts(values), fields, cache=cache, use_cache=cache is not None)
+
+
+def parse_frame(df, column: str, fields: Optional[Iterable[str]] = None, prefix: str = "",
+                cache: Optional[LRUCache] = None):
+    """
+    Return copy of pandas DataFrame with parsed fields of ``column`` added
+    as columns named ``prefix + field``.
+
+    The whole column is parsed in one batch, identical strings once, and
+    the output columns are built directly from ``AffiliationColumns``
+    instead of one dictionary per row. List fields are object columns of
+    lists.
+    """
+    import pandas as pd
+
+    parsed = _parse_column(df[column], fields, cache).to_pandas(index=df.index)
+    parsed.columns = [prefix + c for c in parsed.columns]
+    df = df.drop(columns=[c for c in parsed.columns if c in df.columns])
+    return pd.concat([df, parsed], axis=1)
+
+
+def parse_arrow(data, column: str, fields: Optional[Iterable[str]] = None, prefix: str = "",
+                cache: Optional[LRUCache] = None):
+    """
+    Return pyarrow RecordBatch or Table with parsed fields of ``column``
+    appended, list fields as ``list<string>`` columns
+    """
+    import pyarrow as pa
+
+    parsed = _parse_column(data.column(column).to_pylist(), fields, cache).to_arrow()
+    for name, array in zip(parsed.column_names, parsed.columns):
+        name = prefix + name
+        if name in data.schema.names:
+            data = data.remove_column(data.schema.get_field_index(name))
+        if isinstance(data, pa.RecordBatch):
+            array = array.combine_chunks()
+        data = data.append_column(name, array)
+    return data
+
+
+def parse_partitions(partitions: Iterable, column: str, fields: Optional[Iterable[str]] = None,
+                     prefix: str = ""):
+    """
+    Parse an iterator of pandas DataFrames or Arrow record batches, as
+    handed to ``mapPartitions``/``mapInPandas``/``mapInArrow`` style
+    functions. The parser tables are built once before the first partition
+    and results are cached across partitions.
+    """
+    from .parallel import _init_worker
+
+    _init_worker()
+    cache = LRUCache(maxsize=100000)
+    for partition in partitions:
+        if hasattr(partition, "schema"):
+            yield parse_arrow(partition, column, fields, prefix, cache)
+        else:
+            yield parse_frame(partition, column, fields, prefix, cache)
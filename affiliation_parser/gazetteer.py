@@ -0,0 +1,266 @@
+"""
+Token trie gazetteer for U.S. city names
+"""
+from collections import namedtuple, defaultdict
+import re
+from typing import *
+import zlib
+
+CitySpan = namedtuple("CitySpan", ["city", "start", "end"])
+
+token_re = re.compile(r"\S+")
+_END = None
+
+
+def tokenize(text: str):
+    """
+    Split text into upper-cased tokens with commas and periods removed,
+    return list of ``(token, start, end)`` with character offsets
+    """
+    tokens = []
+    for match in token_re.finditer(text):
+        token = match.group().upper().replace(",", "").replace(".", "")
+        if token:
+            tokens.append((token, match.start(), match.end()))
+    return tokens
+
+
+class CityGazetteer:
+    """
+    Longest-match gazetteer over city names.
+
+    City names are stored in a trie keyed by word so a text is matched by
+    walking its tokens once; the cost depends on the length of the input and
+    not on the longest city name. Each city keeps the set of states it
+    belongs to, which allows state-scoped lookups.
+    """
+
+    def __init__(self, cities: Iterable[str] = (), state_map: Dict[str, Set[str]] = None):
+        self.root = {}
+        self.city_states = defaultdict(set)
+        self.state_cities = defaultdict(set)
+        for city in cities:
+            self.add(city)
+        for state, state_cities in (state_map or {}).items():
+            for city in state_cities:
+                self.add(city, state)
+
+    def add(self, city: str, state: str = None):
+        """
+        Add city, optionally belonging to given state
+        """
+        words = city.split()
+        # names with commas can never match tokenized text
+        if not words or "," in city:
+            return
+        node = self.root
+        for word in words:
+            node = node.setdefault(word, {})
+        node[_END] = " ".join(words)
+        if state is not None:
+            self.city_states[node[_END]].add(state)
+            self.state_cities[state].add(node[_END])
+
+    def __contains__(self, city: str):
+        node = self.root
+        for word in city.split():
+            node = node.get(word)
+            if node is None:
+                return False
+        return _END in node
+
+    def cities_in_state(self, state: str) -> Set[str]:
+        """
+        Return the set of cities that belong to a state
+        """
+        return self.state_cities.get(state, set())
+
+    def iter_matches(self, text: str, state: str = None, allowed: Container[str] = None):
+        """
+        Yield every city occurrence in text as ``CitySpan``, overlapping
+        matches included. Restrict to cities of ``state`` and/or to cities in
+        ``allowed`` if given.
+        """
+        tokens = tokenize(text)
+        for i in range(len(tokens)):
+            node = self.root
+            for token, _, end in tokens[i:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                city = node.get(_END)
+                if city is not None and self._accept(city, state, allowed):
+                    yield CitySpan(city, tokens[i][1], end)
+
+    def find(self, text: str, state: str = None, allowed: Container[str] = None) -> List[CitySpan]:
+        """
+        Return non-overlapping city spans, taking the longest match at the
+        leftmost position first
+        """
+        tokens = tokenize(text)
+        spans = []
+        i = 0
+        while i < len(tokens):
+            node = self.root
+            best = None
+            for j in range(i, len(tokens)):
+                node = node.get(tokens[j][0])
+                if node is None:
+                    break
+                city = node.get(_END)
+                if city is not None and self._accept(city, state, allowed):
+                    best = (city, j)
+            if best is None:
+                i += 1
+                continue
+            city, j = best
+            spans.append(CitySpan(city, tokens[i][1], tokens[j][2]))
+            i = j + 1
+        return spans
+
+    def _accept(self, city, state, allowed):
+        if state is not None and state not in self.city_states.get(city, ()):
+            return False
+        if allowed is not None and city not in allowed:
+            return False
+        return True
+
+
+class FlatCityGazetteer:
+    """
+    ``CityGazetteer`` over the flat token trie of a ``DataArtifact``.
+
+    Tokens are found through a hash table of their UTF-8 bytes and trie
+    nodes are walked by binary search in packed edge arrays, all read from
+    the artifact buffer. Lookups only create short-lived objects and never
+    touch the reference counts of shared data, so the buffer stays shared
+    between processes instead of being copied on write.
+    """
+
+    def __init__(self, artifact):
+        self.artifact = artifact
+        self.strings = artifact.strings
+        for name in ("token_strings", "token_slots", "child_offsets", "edge_token", "edge_child",
+                     "node_city", "node_rank", "node_population", "state_offsets", "node_states"):
+            setattr(self, "_" + name, artifact.array("gazetteer." + name))
+        self._mask = len(self._token_slots) - 1
+        states = artifact.array("gazetteer.states")
+        self._state_index = {self.strings[s]: i for i, s in enumerate(states)}
+
+    def _token(self, token: str) -> int:
+        encoded = token.encode("utf-8")
+        slots = self._token_slots
+        slot = zlib.crc32(encoded) & self._mask
+        while slots[slot]:
+            index = slots[slot] - 1
+            if self.strings.encoded(self._token_strings[index]) == encoded:
+                return index
+            slot = (slot + 1) & self._mask
+        return -1
+
+    def _child(self, node: int, token: int) -> int:
+        edge_token = self._edge_token
+        lo, hi = self._child_offsets[node], self._child_offsets[node + 1]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if edge_token[mid] < token:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._child_offsets[node + 1] and edge_token[lo] == token:
+            return self._edge_child[lo]
+        return -1
+
+    def _node(self, city: str) -> int:
+        node = 0
+        for word in city.split():
+            token = self._token(word)
+            node = self._child(node, token) if token >= 0 else -1
+            if node < 0:
+                return -1
+        return node if self._node_city[node] else -1
+
+    def __contains__(self, city: str):
+        return self._node(city) >= 0
+
+    def rank(self, city: str) -> int:
+        """
+        Return population rank of city (0 is the largest), -1 if unknown
+        """
+        node = self._node(city)
+        return self._node_rank[node] if node >= 0 else -1
+
+    def population(self, city: str) -> float:
+        node = self._node(city)
+        return self._node_population[node] if node >= 0 else 0.0
+
+    def cities_in_state(self, state: str) -> Set[str]:
+        index = self._state_index.get(state)
+        cities = set()
+        for node in range(len(self._node_city)):
+            if self._node_city[node] and self._has_state(node, index):
+                cities.add(self.strings[self._node_city[node] - 1])
+        return cities
+
+    def _has_state(self, node: int, index: Optional[int]) -> bool:
+        states = self._node_states
+        for i in range(self._state_offsets[node], self._state_offsets[node + 1]):
+            if states[i] == index:
+                return True
+        return False
+
+    def _accept(self, node, state_index, allowed, top):
+        if state_index is not False and not self._has_state(node, state_index):
+            return False
+        if top is not None and self._node_rank[node] >= top:
+            return False
+        if allowed is not None and self.strings[self._node_city[node] - 1] not in allowed:
+            return False
+        return True
+
+    def iter_matches(self, text: str, state: str = None, allowed: Container[str] = None,
+                     top: int = None):
+        """
+        Yield every city occurrence in text as ``CitySpan``, see
+        ``CityGazetteer.iter_matches``. ``top`` restricts matches to the
+        ``top`` most populated cities.
+        """
+        tokens = tokenize(text)
+        ids = [self._token(token) for token, _, _ in tokens]
+        state_index = False if state is None else self._state_index.get(state)
+        for i in range(len(tokens)):
+            node = 0
+            for j in range(i, len(tokens)):
+                node = self._child(node, ids[j]) if ids[j] >= 0 else -1
+                if node < 0:
+                    break
+                if self._node_city[node] and self._accept(node, state_index, allowed, top):
+                    yield CitySpan(self.strings[self._node_city[node] - 1], tokens[i][1], tokens[j][2])
+
+    def find(self, text: str, state: str = None, allowed: Container[str] = None,
+             top: int = None) -> List[CitySpan]:
+        """
+        Return non-overlapping city spans, taking the longest match at the
+        leftmost position first
+        """
+        tokens = tokenize(text)
+        ids = [self._token(token) for token, _, _ in tokens]
+        state_index = False if state is None else self._state_index.get(state)
+        spans = []
+        i = 0
+        while i < len(tokens):
+            node = 0
+            best = None
+            for j in range(i, len(tokens)):
+                node = self._child(node, ids[j]) if ids[j] >= 0 else -1
+                if node < 0:
+                    break
+                if self._node_city[node] and self._accept(node, state_index, allowed, top):
+                    best = (node, j)
+            if best is None:
+                i += 1
+                continue
+            node, j = best
+            spans.append(CitySpan(self.strings[self._node_city[node] - 1], tokens[i][1], tokens[j][2]))
+            i = j + 1
+        return spans
@@ -0,0 +1,341 @@
+"""
+Compact gazetteer of world place names built from a GeoNames dump
+
+Build it once from a local dump, e.g. ``allCountries.txt`` or
+``cities500.txt`` with the optional ``countryInfo.txt``
+
+    python -m affiliation_parser.geonames allCountries.txt world.bin [countryInfo.txt]
+
+The output uses the format of the data artifact and is memory-mapped, so
+millions of names cost no Python objects and the pages are shared by all
+processes reading the file.
+"""
+from collections import namedtuple
+import array
+import hashlib
+import logging
+import os
+import sys
+import zlib
+from typing import *
+from .artifact import ArtifactBuilder, DataArtifact
+from .gazetteer import tokenize
+
+logger = logging.getLogger(__name__)
+
+WorldCity = namedtuple("WorldCity", ["name", "country", "population", "geonameid"])
+WorldCitySpan = namedtuple("WorldCitySpan", ["city", "start", "end"])
+
+# GeoNames "geoname" table columns
+GEONAMEID, NAME, ASCIINAME, ALTERNATENAMES = 0, 1, 2, 3
+FEATURE_CLASS, COUNTRY_CODE, POPULATION = 6, 8, 14
+MAX_POPULATION = 0xFFFFFFFF
+
+# ISO codes of the canonical names in ``keywords.COUNTRY``, the names
+# ``parse_affil`` returns, which often differ from GeoNames names
+COUNTRY_CODES = {
+    "albania": "AL", "argentina": "AR", "armenia": "AM", "australia": "AU", "austria": "AT",
+    "belgium": "BE", "bosnia and herzegovina": "BA", "brazil": "BR", "canada": "CA",
+    "china": "CN", "colombia": "CO", "congo": "CG", "croatia": "HR", "cyprus": "CY",
+    "czech republic": "CZ", "denmark": "DK", "egypt": "EG", "finland": "FI", "france": "FR",
+    "gambia": "GM", "germany": "DE", "greece": "GR", "hong kong": "HK", "hungary": "HU",
+    "india": "IN", "iran": "IR", "ireland": "IE", "israel": "IL", "italy": "IT", "japan": "JP",
+    "kuwait": "KW", "lithuania": "LT", "malaysia": "MY", "mexico": "MX", "netherlands": "NL",
+    "new zealand": "NZ", "nigeria": "NG", "norway": "NO", "peru": "PE", "philippines": "PH",
+    "poland": "PL", "portugal": "PT", "romania": "RO", "russia": "RU", "saudi arabia": "SA",
+    "south africa": "ZA", "south korea": "KR", "spain": "ES", "sri lanka": "LK", "sweden": "SE",
+    "switzerland": "CH", "taiwan": "TW", "tanzania": "TZ", "thailand": "TH", "tunisia": "TN",
+    "turkey": "TR", "united kingdom": "GB", "united states of america": "US", "vietnam": "VN",
+    "zimbabwe": "ZW",
+}
+
+
+def name_key(name: str) -> str:
+    """
+    Upper-cased words of a place name without commas and periods, the way
+    affiliation text is matched
+    """
+    return " ".join(token for token, _, _ in tokenize(name))
+
+
+def iter_geonames(path: str, feature_classes: Container[str] = ("P",), min_population: int = 0,
+                  alternate_names: bool = False):
+    """
+    Yield ``(key, name, country code, population, geonameid)`` for places of
+    a GeoNames dump, one per ASCII name and, with ``alternate_names``, per
+    ASCII alternate name
+    """
+    with open(path, encoding="utf-8") as fp:
+        for line in fp:
+            row = line.rstrip("\n").split("\t")
+            if len(row) <= POPULATION or row[FEATURE_CLASS] not in feature_classes:
+                continue
+            population = int(row[POPULATION] or 0)
+            if population < min_population:
+                continue
+            name = row[ASCIINAME] or row[NAME]
+            place = (name, row[COUNTRY_CODE], min(population, MAX_POPULATION), int(row[GEONAMEID]))
+            keys = {name_key(name)}
+            if alternate_names and row[ALTERNATENAMES]:
+                keys.update(name_key(a) for a in row[ALTERNATENAMES].split(",") if a.isascii())
+            for key in keys:
+                if key:
+                    yield (key,) + place
+
+
+def read_country_info(path: str) -> List[Tuple[str, str]]:
+    """
+    Return ``(ISO code, lower-cased name)`` rows of a GeoNames
+    ``countryInfo.txt`` file
+    """
+    rows = []
+    with open(path, encoding="utf-8") as fp:
+        for line in fp:
+            if line.startswith("#"):
+                continue
+            row = line.rstrip("\n").split("\t")
+            if len(row) > 4 and row[0]:
+                rows.append((row[0], row[4].lower()))
+    return rows
+
+
+def compile_world_gazetteer(places: Iterable[Tuple[str, str, str, int, int]],
+                            country_names: Iterable[Tuple[str, str]] = ()) -> ArtifactBuilder:
+    """
+    Collect places into sorted packed arrays.
+
+    Every name key and every word prefix of a multi-word key gets an entry
+    range, empty for prefixes, so a text is matched by extending word
+    n-grams only while they are a known prefix. Keys are found through an
+    open addressing hash table of their UTF-8 bytes. The places of a key are
+    sorted by country and decreasing population, and the most populated
+    place of each key in any country is kept in ``world.key_best``.
+    """
+    builder = ArtifactBuilder()
+    country_names = sorted(country_names)
+    countries = {}
+    for code, _ in country_names:
+        countries.setdefault(code, len(countries))
+    keys = {}
+    place_key = array.array("I")
+    place_name = array.array("I")
+    place_country = array.array("H")
+    place_population = array.array("I")
+    place_geonameid = array.array("I")
+    for key, name, country, population, geonameid in places:
+        words = key.split()
+        for n in range(1, len(words)):
+            keys.setdefault(" ".join(words[:n]), len(keys))
+        place_key.append(keys.setdefault(key, len(keys)))
+        place_name.append(builder.intern(name))
+        place_country.append(countries.setdefault(country, len(countries)))
+        place_population.append(population)
+        place_geonameid.append(geonameid)
+
+    key_order = sorted(keys)
+    key_rank = array.array("I", bytes(4 * len(keys)))
+    for rank, key in enumerate(key_order):
+        key_rank[keys[key]] = rank
+    country_order = sorted(countries, key=countries.get)
+    order = sorted(range(len(place_key)), key=lambda i: (
+        key_rank[place_key[i]], country_order[place_country[i]], -place_population[i], place_geonameid[i]
+    ))
+    key_offsets = array.array("I", [0] * (len(keys) + 1))
+    for i in order:
+        key_offsets[key_rank[place_key[i]] + 1] += 1
+    for rank in range(len(keys)):
+        key_offsets[rank + 1] += key_offsets[rank]
+    key_best = array.array("I", key_offsets[:-1])
+    for rank in range(len(keys)):
+        for position in range(key_offsets[rank], key_offsets[rank + 1]):
+            if place_population[order[position]] > place_population[order[key_best[rank]]]:
+                key_best[rank] = position
+
+    size = 1 << (2 * len(keys) - 1).bit_length() if keys else 1
+    slots = array.array("I", bytes(4 * size))
+    for rank, key in enumerate(key_order):
+        slot = zlib.crc32(key.encode("utf-8")) & (size - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (size - 1)
+        slots[slot] = rank + 1
+
+    builder.add("world.keys", "I", map(builder.intern, key_order))
+    builder.add("world.key_slots", "I", slots)
+    builder.sections["world.key_offsets"] = key_offsets
+    builder.sections["world.key_best"] = key_best
+    builder.add("world.name", "I", (place_name[i] for i in order))
+    builder.add("world.country", "H", (place_country[i] for i in order))
+    builder.add("world.population", "I", (place_population[i] for i in order))
+    builder.add("world.geonameid", "I", (place_geonameid[i] for i in order))
+    builder.add("world.countries", "I", map(builder.intern, country_order))
+    builder.add_rows("world.country_names", country_names)
+    return builder
+
+
+def build_world_gazetteer(source: str, path: str, country_info: Optional[str] = None,
+                          **kwargs) -> str:
+    """
+    Compile GeoNames dump ``source`` into a gazetteer file at ``path``,
+    ``kwargs`` are passed to ``iter_geonames``
+    """
+    country_names = read_country_info(country_info) if country_info else ()
+    builder = compile_world_gazetteer(iter_geonames(source, **kwargs), country_names)
+    stat = os.stat(source)
+    fingerprint = hashlib.md5(f"{source}:{stat.st_size}:{stat.st_mtime}".encode()).hexdigest()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fp:
+        builder.write(fp, fingerprint)
+    os.replace(tmp_path, path)
+    logger.info("wrote %d names of %d places to %s", len(builder.sections["world.keys"]),
+                len(builder.sections["world.name"]), path)
+    return path
+
+
+class WorldGazetteer:
+    """
+    Read-only gazetteer of world place names over a memory-mapped file
+    written by ``build_world_gazetteer``.
+
+    A lookup hashes the name key and probes the key table, then reads the
+    places of the key from packed arrays; only the places returned become
+    Python objects. ``country`` scopes lookups to an ISO country code, a
+    country name from ``countryInfo.txt`` or a country name returned by
+    ``parse_affil``; an unknown country matches nothing.
+    """
+
+    def __init__(self, path: str):
+        self.artifact = artifact = DataArtifact(path)
+        if "world.keys" not in artifact:
+            raise ValueError(f"{path} is not a world gazetteer")
+        if "world.key_best" not in artifact:
+            raise ValueError(f"{path} was built by an older version, rebuild it")
+        self.strings = artifact.strings
+        for name in ("keys", "key_slots", "key_offsets", "key_best", "name", "country", "population",
+                     "geonameid", "countries"):
+            setattr(self, "_" + name, artifact.array("world." + name))
+        self._mask = len(self._key_slots) - 1
+        self._country_index = {self.strings[code]: i for i, code in enumerate(self._countries)}
+        for code, name in artifact.rows("world.country_names"):
+            self._country_index.setdefault(name, self._country_index[code])
+        for name, code in COUNTRY_CODES.items():
+            if code in self._country_index:
+                self._country_index.setdefault(name, self._country_index[code])
+
+    def __len__(self):
+        return len(self._name)
+
+    def country_index(self, country: str) -> Optional[int]:
+        """
+        Return index of an ISO country code or country name, None if unknown
+        """
+        index = self._country_index.get(country.upper())
+        return index if index is not None else self._country_index.get(country.strip().lower())
+
+    def _key(self, key: str) -> int:
+        encoded = key.encode("utf-8")
+        slots = self._key_slots
+        slot = zlib.crc32(encoded) & self._mask
+        while slots[slot]:
+            index = slots[slot] - 1
+            if self.strings.encoded(self._keys[index]) == encoded:
+                return index
+            slot = (slot + 1) & self._mask
+        return -1
+
+    def _places(self, key: int, country: Optional[int], min_population: int):
+        start, end = self._key_offsets[key], self._key_offsets[key + 1]
+        for i in range(start, end):
+            if country is not None and self._country[i] != country:
+                continue
+            if self._population[i] >= min_population:
+                yield i
+
+    def _best(self, key: int, country: Optional[int], min_population: int) -> int:
+        """
+        Return the most populated place of ``key`` in ``country`` or in any
+        country, -1 if there is none
+        """
+        if self._key_offsets[key] == self._key_offsets[key + 1]:
+            return -1
+        if country is None:
+            best = self._key_best[key]
+            return best if self._population[best] >= min_population else -1
+        # places of a country are sorted by decreasing population
+        return next(self._places(key, country, min_population), -1)
+
+    def _place(self, i: int) -> WorldCity:
+        return WorldCity(self.strings[self._name[i]], self.strings[self._countries[self._country[i]]],
+                         self._population[i], self._geonameid[i])
+
+    def _scope(self, country):
+        if country is None:
+            return None, True
+        index = self.country_index(country)
+        return index, index is not None
+
+    def lookup(self, name: str, country: Optional[str] = None, min_population: int = 0) -> List[WorldCity]:
+        """
+        Return places called ``name``, by country and decreasing population
+        """
+        country, known = self._scope(country)
+        key = self._key(name_key(name))
+        if key < 0 or not known:
+            return []
+        return [self._place(i) for i in self._places(key, country, min_population)]
+
+    def __contains__(self, name: str):
+        key = self._key(name_key(name))
+        return key >= 0 and self._key_offsets[key] < self._key_offsets[key + 1]
+
+    def iter_matches(self, text: str, country: Optional[str] = None, min_population: int = 0):
+        """
+        Yield every place name occurrence in text as ``WorldCitySpan`` of the
+        most populated matching place, overlapping matches included
+        """
+        country, known = self._scope(country)
+        if not known:
+            return
+        tokens = tokenize(text)
+        for i in range(len(tokens)):
+            for j in range(i, len(tokens)):
+                key = self._key(" ".join(token for token, _, _ in tokens[i:j + 1]))
+                if key < 0:
+                    break
+                place = self._best(key, country, min_population)
+                if place >= 0:
+                    yield WorldCitySpan(self._place(place), tokens[i][1], tokens[j][2])
+
+    def find(self, text: str, country: Optional[str] = None, min_population: int = 0) -> List[WorldCitySpan]:
+        """
+        Return non-overlapping place spans, taking the longest match at the
+        leftmost position first
+        """
+        country, known = self._scope(country)
+        if not known:
+            return []
+        tokens = tokenize(text)
+        spans = []
+        i = 0
+        while i < len(tokens):
+            best = None
+            for j in range(i, len(tokens)):
+                key = self._key(" ".join(token for token, _, _ in tokens[i:j + 1]))
+                if key < 0:
+                    break
+                place = self._best(key, country, min_population)
+                if place >= 0:
+                    best = (place, j)
+            if best is None:
+                i += 1
+                continue
+            place, j = best
+            spans.append(WorldCitySpan(self._place(place), tokens[i][1], tokens[j][2]))
+            i = j + 1
+        return spans
+
+    def close(self):
+        self.artifact.close()
+
+
+if __name__ == "__main__":
+    print(build_world_gazetteer(sys.argv[1], sys.argv[2], *sys.argv[3:4]))
@@ -0,0 +1,264 @@
+"""
+Indexed institution abbreviation, multiple campus and known institution
+tables
+"""
+from collections import Counter
+import csv
+import re
+import string
+from typing import *
+from .automaton import KeywordAutomaton
+
+
+def _is_word_char(ch: str):
+    return ch.isalnum() or ch == "_"
+
+
+def read_table(path: str) -> List[List[str]]:
+    """
+    Read CSV file where each row is a name followed by any number of values,
+    empty cells and rows are skipped
+    """
+    rows = []
+    with open(path, encoding="utf-8", newline="") as fp:
+        for row in csv.reader(fp):
+            row = [cell.strip() for cell in row if cell.strip()]
+            if row:
+                rows.append(row)
+    return rows
+
+
+class AbbreviationTable:
+    """
+    Map abbreviations to full institution names.
+
+    Each entry is a full name followed by its abbreviations, as in
+    ``UNIVERSITY_ABBR``. Abbreviations are matched case-sensitively on token
+    boundaries by a keyword automaton, so a lookup scans the text once
+    whatever the size of the table.
+    """
+
+    def __init__(self, entries: Iterable[Sequence[str]] = ()):
+        self.names = []
+        self.automaton = KeywordAutomaton()
+        self.extend(entries)
+
+    def add(self, full_name: str, abbreviations: Iterable[str] = ()):
+        """
+        Add full institution name with its abbreviations
+        """
+        rank = len(self.names)
+        self.names.append(full_name)
+        for i, alias in enumerate([full_name, *abbreviations]):
+            alias = alias.strip()
+            if alias:
+                self.automaton.add(alias, (rank, i))
+        return self
+
+    def extend(self, entries: Iterable[Sequence[str]]):
+        for full_name, *abbreviations in entries:
+            self.add(full_name, abbreviations)
+        return self
+
+    def load_csv(self, path: str):
+        """
+        Add entries from CSV file with rows ``full name, abbreviation, ...``
+        """
+        return self.extend(read_table(path))
+
+    def matches(self, text: str):
+        """
+        Yield ``(start, end, rank, index)`` of names and abbreviations found
+        on token boundaries, index 0 being the full name
+        """
+        for start, end, alias, (rank, i) in self.automaton.iter_matches(text):
+            if _is_word_char(alias[0]) and start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if _is_word_char(alias[-1]) and end < len(text) and _is_word_char(text[end]):
+                continue
+            yield start, end, rank, i
+
+    def replace(self, text: str) -> str:
+        """
+        Replace abbreviation of the first matching entry with its full name.
+        Nothing is replaced when the full name is already in the text.
+        """
+        matches = list(self.matches(text))
+        if not matches:
+            return text
+        rank, index = min((rank, i) for _, _, rank, i in matches)
+        if index == 0:
+            return text
+        pieces = []
+        last = 0
+        for start, end, r, i in sorted(matches):
+            if (r, i) == (rank, index) and start >= last:
+                pieces.append(text[last:start])
+                pieces.append(self.names[rank])
+                last = end
+        pieces.append(text[last:])
+        return "".join(pieces)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class CampusTable:
+    """
+    Campus cities of universities with multiple campuses, keyed by the
+    parent university name as in ``UNIVERSITY_MULTIPLE_CAMPUS``
+    """
+
+    def __init__(self, entries: Iterable[Sequence[str]] = ()):
+        self.campuses = {}
+        self.rank = {}
+        self.automaton = KeywordAutomaton()
+        self.extend(entries)
+
+    def add(self, university: str, cities: Iterable[str] = ()):
+        """
+        Add parent university and its campus cities
+        """
+        university = university.strip().lower()
+        if university not in self.campuses:
+            self.rank[university] = len(self.rank)
+            self.campuses[university] = []
+            self.automaton.add(university, university)
+        campuses = self.campuses[university]
+        for city in cities:
+            city = city.strip().lower()
+            if city and city not in campuses:
+                campuses.append(city)
+        return self
+
+    def extend(self, entries: Iterable[Sequence[str]]):
+        for university, *cities in entries:
+            self.add(university, cities)
+        return self
+
+    def load_csv(self, path: str):
+        """
+        Add entries from CSV file with rows ``university, city, ...``
+        """
+        return self.extend(read_table(path))
+
+    def append_city(self, affil: str, location: str) -> str:
+        """
+        Append campus city found in location to the university name in affil
+        """
+        affil_lower = affil.lower()
+        universities = self.automaton.labels(affil_lower)
+        if not universities:
+            return affil
+        location_lower = location.lower()
+        for university in sorted(universities, key=self.rank.get):
+            for city in self.campuses[university]:
+                if city in location_lower and not city in affil_lower:
+                    return affil + " " + city
+        return affil
+
+    def __len__(self):
+        return len(self.campuses)
+
+
+class InstitutionRecognizer:
+    """
+    Known institution names, e.g. from GRID and NPI, matched on whole
+    segments and on token spans within segments.
+
+    Names are normalized once when added (upper case, ``&`` as ``AND``,
+    punctuation as spaces) and kept as a set of keys. A segment is
+    normalized the same way and looked up as a whole, then with ``spans``
+    every run of tokens is tried, only at tokens starting a known name and
+    up to the longest name starting there. The cost depends on the segment
+    and not on the number of names.
+
+    Whole segments and spans must have at least ``min_tokens`` tokens, and
+    names made only of words found in more than ``generic_share`` of the
+    names, e.g. "Community Hospital", are too generic and not matched.
+    """
+
+    punct_re = re.compile("[{}]".format(re.escape(string.punctuation)))
+
+    def __init__(self, names: Iterable[str] = (), spans: bool = True, min_tokens: int = 2,
+                 generic_share: float = 0.003):
+        self.spans = spans
+        self.min_tokens = min_tokens
+        self.generic_share = generic_share
+        self.keys = set()
+        # first token -> number of tokens of the longest name starting with it
+        self.first_tokens = {}
+        # token -> number of names using it
+        self.token_counts = Counter()
+        self._generic = None
+        self.extend(names)
+
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        return cls.punct_re.sub(" ", text.upper().replace("&", " AND ")).split()
+
+    def add(self, name: str):
+        tokens = self.tokenize(name)
+        key = " ".join(tokens)
+        if tokens and key not in self.keys:
+            self.keys.add(key)
+            self.token_counts.update(set(tokens))
+            self._generic = None
+            if len(tokens) > self.first_tokens.get(tokens[0], 0):
+                self.first_tokens[tokens[0]] = len(tokens)
+        return self
+
+    @property
+    def generic(self) -> Set[str]:
+        """
+        Words used by more than ``generic_share`` of the names, and by more
+        than one name so short name lists keep their words
+        """
+        if self._generic is None:
+            limit = max(self.generic_share * len(self.keys), 1)
+            self._generic = {token for token, count in self.token_counts.items() if count > limit}
+        return self._generic
+
+    def extend(self, names: Iterable[str]):
+        for name in names:
+            self.add(name)
+        return self
+
+    def load_csv(self, path: str, column: str = "institution"):
+        """
+        Add names from ``column`` of CSV file with a header row
+        """
+        with open(path, encoding="utf-8", newline="") as fp:
+            reader = csv.reader(fp)
+            index = next(reader).index(column)
+            return self.extend(row[index] for row in reader if len(row) > index)
+
+    def find(self, segment: str) -> str:
+        """
+        Return normalized name of the known institution in segment, the
+        whole segment first and then the longest leftmost span, "" if none
+        """
+        tokens = self.tokenize(segment)
+        if self._match(tokens):
+            return " ".join(tokens)
+        if not self.spans:
+            return ""
+        for i, token in enumerate(tokens):
+            longest = min(self.first_tokens.get(token, 0), len(tokens) - i)
+            for n in range(longest, self.min_tokens - 1, -1):
+                if self._match(tokens[i:i + n]):
+                    return " ".join(tokens[i:i + n])
+        return ""
+
+    def _match(self, tokens: List[str]) -> bool:
+        return (
+            len(tokens) >= self.min_tokens
+            and " ".join(tokens) in self.keys
+            and not self.generic.issuperset(tokens)
+        )
+
+    def __contains__(self, name: str):
+        return " ".join(self.tokenize(name)) in self.keys
+
+    def __len__(self):
+        return len(self.keys)
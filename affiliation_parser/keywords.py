@@ -275,7 +275,7 @@ COUNTRY = (
     (
         "united kingdom",
         "u.k.",
-        "\buk\b",
+        r"\buk\b",
         "uk.",
         "england",
         " uk",
@@ -619,6 +619,46 @@ STATE_MAP = {
 
 INVERSE_STATE_MAP = {v:k for k,v in STATE_MAP.items()}
 
+# first three digits of U.S. ZIP codes assigned to each state, as
+# (first prefix, last prefix, state); military and shared prefixes are left out
+ZIP_PREFIX_STATE = (
+    ("005", "005", "NY"), ("006", "007", "PR"), ("008", "008", "VI"), ("009", "009", "PR"),
+    ("010", "027", "MA"), ("028", "029", "RI"), ("030", "038", "NH"), ("039", "049", "ME"),
+    ("050", "054", "VT"), ("055", "055", "MA"), ("056", "059", "VT"), ("060", "069", "CT"),
+    ("070", "089", "NJ"), ("100", "149", "NY"), ("150", "196", "PA"), ("197", "199", "DE"),
+    ("200", "200", "DC"), ("201", "201", "VA"), ("202", "205", "DC"), ("206", "219", "MD"),
+    ("220", "246", "VA"), ("247", "268", "WV"), ("270", "289", "NC"), ("290", "299", "SC"),
+    ("300", "319", "GA"), ("320", "339", "FL"), ("341", "349", "FL"), ("350", "369", "AL"),
+    ("370", "385", "TN"), ("386", "397", "MS"), ("398", "399", "GA"), ("400", "427", "KY"),
+    ("430", "459", "OH"), ("460", "479", "IN"), ("480", "499", "MI"), ("500", "528", "IA"),
+    ("530", "549", "WI"), ("550", "567", "MN"), ("569", "569", "DC"), ("570", "577", "SD"),
+    ("580", "588", "ND"), ("590", "599", "MT"), ("600", "629", "IL"), ("630", "658", "MO"),
+    ("660", "679", "KS"), ("680", "693", "NE"), ("700", "714", "LA"), ("716", "729", "AR"),
+    ("730", "749", "OK"), ("750", "799", "TX"), ("800", "816", "CO"), ("820", "831", "WY"),
+    ("832", "838", "ID"), ("840", "847", "UT"), ("850", "865", "AZ"), ("870", "884", "NM"),
+    ("885", "885", "TX"), ("889", "898", "NV"), ("900", "961", "CA"), ("967", "968", "HI"),
+    ("970", "979", "OR"), ("980", "994", "WA"), ("995", "999", "AK"),
+)
+
+# text normalization applied by clean_text, literal (text, replacement)
+# rules where a space also matches a tab
+NORMALIZATION_RULES = (
+    ("\t", " "),
+    ("Dept. ", "Department "),
+    ("Surg. ", "Surgery "),
+    ("Univ. ", "University "),
+    ("*", " "),
+    (";", ""),
+    ("E-mail:", ""),
+    ("email:", ""),
+    ("P.O. Box", ""),
+)
+
+# regular expression (pattern, replacement) normalization rules
+NORMALIZATION_PATTERNS = (
+    (r"\A2\.?[ \t]", ""),
+)
+
 # full name and abbreviation
 UNIVERSITY_ABBR = (
     ("university of california los angeles", "UCLA", "UC Los Angeles"),
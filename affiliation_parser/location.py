@@ -0,0 +1,130 @@
+"""
+Compiled scanner for country aliases and U.S. states
+"""
+from collections import namedtuple
+import string
+from typing import *
+from .automaton import KeywordAutomaton
+from .keywords import COUNTRY, STATES, STATE_MAP
+
+LocationMatch = namedtuple("LocationMatch", ["kind", "value", "alias", "start", "end"])
+
+PRIORITIES = ("table", "last")
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+_BOUNDARY = r"\b"
+
+
+def _is_word_char(ch: str):
+    return ch.isalnum() or ch == "_"
+
+
+def state_table(states: Iterable[str] = STATES):
+    """
+    Deterministic lookup order for ``STATES``: full state names, longest
+    first, followed by the two letter abbreviations
+    """
+    names = sorted((s for s in states if len(s.strip()) > 2), key=lambda s: (-len(s), s))
+    abbrs = sorted(s for s in states if len(s.strip()) <= 2)
+    return tuple(names + abbrs)
+
+
+class LocationScanner:
+    """
+    Find every country alias and U.S. state name or abbreviation in a
+    single scan of the text.
+
+    Country aliases are matched case-insensitively, state names and
+    abbreviations case-sensitively. Aliases written as ``\\bword\\b`` only
+    match on word boundaries. State abbreviations must not be followed by
+    a letter.
+
+    Priority rules used to pick one country or state from the matches:
+
+    - ``"table"``: for countries, the first hit in ``COUNTRY`` order as
+      the original ``find_country``. States are picked as with
+      ``"last"``: full state names are often city or institution names
+      ("Washington, DC", "Kansas City, MO", "Indiana, PA") followed by
+      the actual state.
+    - ``"last"``: the match ending last in the text wins, ties are broken
+      by the longer alias, so "West Virginia" beats "Virginia".
+    """
+
+    def __init__(self, countries=COUNTRY, states=STATES, state_map=STATE_MAP):
+        self.countries = tuple(countries)
+        self.states = state_table(states)
+        self.state_map = state_map
+        self.automaton = KeywordAutomaton()
+        for rank, aliases in enumerate(self.countries):
+            for alias in aliases:
+                left = alias.startswith(_BOUNDARY)
+                right = alias.endswith(_BOUNDARY) and len(alias) > len(_BOUNDARY)
+                word = alias[len(_BOUNDARY) if left else 0:len(alias) - len(_BOUNDARY) if right else None]
+                self.automaton.add(word.lower(), ("country", rank, left, right))
+        for rank, state in enumerate(self.states):
+            self.automaton.add(state.lower(), ("state", rank, state))
+        self.automaton.build()
+
+    def scan(self, text: str) -> List[LocationMatch]:
+        """
+        Return all country and state matches in text with their positions
+        """
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            lowered = text.translate(_ASCII_LOWER)
+        matches = []
+        for start, end, _, label in self.automaton.iter_matches(lowered):
+            if label[0] == "country":
+                _, rank, left, right = label
+                if left and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if right and end < len(text) and _is_word_char(text[end]):
+                    continue
+                matches.append(LocationMatch("country", rank, text[start:end], start, end))
+            else:
+                _, rank, state = label
+                if text[start:end] != state:
+                    continue
+                stripped_state = state.strip()
+                if len(stripped_state) == 2:
+                    # state abbreviations must not be followed by a letter
+                    if end < len(text) and text[end] in string.ascii_letters:
+                        continue
+                matches.append(LocationMatch("state", rank, stripped_state, start, end))
+        return matches
+
+    def _select(self, matches, kind, priority):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}, expected one of {PRIORITIES}")
+        matches = [m for m in matches if m.kind == kind]
+        if not matches:
+            return None
+        if priority == "table" and kind == "country":
+            return min(matches, key=lambda m: (m.value, m.start))
+        return max(matches, key=lambda m: (m.end, m.end - m.start))
+
+    def select_country(self, matches: List[LocationMatch], priority: str = "table"):
+        """
+        Pick country from scan matches, return "" if there is none
+        """
+        match = self._select(matches, "country", priority)
+        if match is None:
+            return ""
+        return self.countries[match.value][0]
+
+    def select_state(self, matches: List[LocationMatch], priority: str = "table"):
+        """
+        Pick U.S. state from scan matches, return abbreviation and the
+        extracted state string or ``("", None)``
+        """
+        match = self._select(matches, "state", priority)
+        if match is None:
+            return "", None
+        if len(match.alias) == 2:
+            return match.alias, match.alias
+        return self.state_map[match.alias], match.alias
+
+    def find_country(self, text: str, priority: str = "table"):
+        return self.select_country(self.scan(text), priority)
+
+    def find_state(self, text: str, priority: str = "table"):
+        return self.select_state(self.scan(text), priority)
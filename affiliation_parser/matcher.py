@@ -1,6 +1,7 @@
 import os
 import re
 import csv
+from functools import lru_cache
 from pathlib import Path
 import subprocess
 import recordlinkage
@@ -11,37 +12,52 @@ import pandas as pd
 # from nltk.tokenize import WhitespaceTokenizer
 
 from .utils import download_grid_data
-from .parse import parse_affil, preprocess
-from .parse import hospital_df
+from .parse import cache_namespace, parse_affil, preprocess
+from .disk_cache import input_key
 
 
 # path = Path(os.getenv("~", '~/.affliation_parser')).expanduser()
 # grid_path = (path/"grid")
 # if not grid_path.exists():
 #     download_grid_data()
-# grid_df = pd.read_csv(grid_path/"grid.csv", header=0,
-#                       names=["grid_id", "institution", "city", "state", "country"])
-# grid_df = grid_df[grid_df['country'] == "United States"]
-# grid_df['institution'] = grid_df['institution'].str.replace(" (United States)", "", regex=False)
-# grid_df = pd.concat([grid_df, hospital_df], ignore_index=True)
-# grid_df["location"] = grid_df.city + " " + grid_df.state
-# grid_df['institution'] = grid_df['institution'].str.lower()
-# grid_df = grid_df.drop_duplicates(subset=['institution'])
-# del grid_df['Unnamed: 0']
-
-# # recordlinkage comparer
-# compare = recordlinkage.Compare()
-# compare.string("institution", "institution", method="levenshtein")
-# compare.string("location", "location", method="jarowinkler")
-# compare.string("country", "country", method="jarowinkler")
+
+
+@lru_cache(maxsize=None)
+def grid_table():
+    """
+    Bundled U.S. GRID institutions and NPI hospitals prepared for matching,
+    with the record linkage comparer, built on first use
+    """
+    data_path = os.path.join(os.path.dirname(__file__), "data")
+    grid_df = pd.read_csv(os.path.join(data_path, "grid.csv"), dtype=str)
+    hospital_df = pd.read_csv(os.path.join(data_path, "hospital_npi.csv"), index_col=0, dtype=str)
+    grid_df = grid_df[grid_df['country'] == "United States"]
+    grid_df['institution'] = grid_df['institution'].str.replace(" (United States)", "", regex=False)
+    grid_df = pd.concat([grid_df, hospital_df], ignore_index=True)
+    grid_df["location"] = grid_df.city + " " + grid_df.state
+    grid_df['institution'] = grid_df['institution'].str.lower()
+    grid_df = grid_df.drop_duplicates(subset=['institution']).reset_index(drop=True)
+
+    # recordlinkage comparer
+    compare = recordlinkage.Compare()
+    compare.string("institution", "institution", method="levenshtein")
+    compare.string("location", "location", method="jarowinkler")
+    compare.string("country", "country", method="jarowinkler")
+    return grid_df, compare
+
 
 def match_affil(affiliation: str, k: int = 3):
     """
     Match affliation to GRID dataset.
     Return a da
     """
-    parsed_affil = parse_affil(affiliation)
-    df = pd.DataFrame([parsed_affil])
+    grid_df, compare = grid_table()
+    parsed_affil = parse_affil(affiliation, fields=["institution", "location", "country"])
+    df = pd.DataFrame([{
+        "institution": " ".join(parsed_affil["institution"]).lower(),
+        "location": parsed_affil["location"],
+        "country": parsed_affil["country"],
+    }])
 
     indexer = recordlinkage.Index()
     indexer.add(Full())
@@ -55,3 +71,26 @@ def match_affil(affiliation: str, k: int = 3):
         drop(labels=["level_0", "level_1", "location"], axis=1)
 
     return topk_df.to_dict(orient="records")
+
+
+def match_affil_many(affiliations, k: int = 3, disk_cache=None):
+    """
+    Match many affiliations to GRID dataset, each distinct string once.
+    Results found in ``disk_cache`` (a ``DiskCache``) are reused and new
+    ones stored in it in one batch.
+    """
+    affiliations = list(affiliations)
+    namespace = cache_namespace(f"match_affil:{k}")
+    keys = {a: input_key(a) for a in dict.fromkeys(affiliations)}
+    found = disk_cache.get_many(namespace, keys.values()) if disk_cache is not None else {}
+    matches = {}
+    new = []
+    for affiliation, key in keys.items():
+        if key in found:
+            matches[affiliation] = found[key]
+        else:
+            matches[affiliation] = match_affil(affiliation, k)
+            new.append(affiliation)
+    if disk_cache is not None:
+        disk_cache.put_many(namespace, ((keys[a], matches[a]) for a in new))
+    return [matches[a] for a in affiliations]
@@ -0,0 +1,130 @@
+"""
+Streaming reader of affiliations in PubMed/MEDLINE baseline and update XML
+"""
+import glob
+import gzip
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import *
+from xml.etree.ElementTree import iterparse
+from .batch import iter_parse_affil
+
+ARTICLE_TAGS = ("PubmedArticle", "PubmedBookArticle")
+
+
+def open_xml(path: str):
+    """
+    Open XML file for binary reading, ``.gz`` files are decompressed on the fly
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _text(element) -> str:
+    return " ".join("".join(element.itertext()).split())
+
+
+def article_affiliations(article):
+    """
+    Yield ``(pmid, author index, affiliation)`` of one ``PubmedArticle``
+    element. Author index is the 0-based position in the author list, or
+    None for the article level ``Affiliation`` of older records.
+    """
+    pmid = article.findtext(".//PMID")
+    for author_list in article.iter("AuthorList"):
+        for index, author in enumerate(author_list.iter("Author")):
+            for affiliation in author.iter("Affiliation"):
+                text = _text(affiliation)
+                if text:
+                    yield pmid, index, text
+    # before 2014 a single affiliation was stored on the article
+    for affiliation in article.iterfind(".//Article/Affiliation"):
+        text = _text(affiliation)
+        if text:
+            yield pmid, None, text
+
+
+def iter_affiliations(path: str):
+    """
+    Yield ``(pmid, author index, affiliation)`` from a PubMed XML file.
+
+    The file is read incrementally and every article element is cleared
+    once its affiliations are read, so memory does not grow with file size.
+    """
+    with open_xml(path) as fp:
+        context = iterparse(fp, events=("start", "end"))
+        _, root = next(context)
+        for event, element in context:
+            if event == "end" and element.tag in ARTICLE_TAGS:
+                yield from article_affiliations(element)
+                element.clear()
+                # drop references kept by the root to cleared articles
+                root.clear()
+
+
+def parse_medline_file(path: str, fields: Optional[Iterable[str]] = None,
+                       batch_size: int = 10000):
+    """
+    Yield ``(pmid, author index, affiliation, parsed result)`` of every
+    affiliation in a PubMed XML file
+    """
+    records = deque()
+
+    def texts():
+        for record in iter_affiliations(path):
+            records.append(record)
+            yield record[2]
+
+    # at most one batch of records is held
+    for result in iter_parse_affil(texts(), fields, batch_size=batch_size):
+        yield (*records.popleft(), result)
+
+
+def write_medline_file(path: str, output_path: str, fields: Optional[Iterable[str]] = None,
+                       batch_size: int = 10000) -> int:
+    """
+    Parse affiliations of a PubMed XML file into JSON lines with ``pmid``,
+    ``author_index`` and ``affiliation`` followed by parsed fields, return
+    number of records written
+    """
+    n = 0
+    opener = gzip.open if output_path.endswith(".gz") else open
+    with opener(output_path, "wt", encoding="utf-8") as fp:
+        for pmid, index, affiliation, result in parse_medline_file(path, fields, batch_size):
+            record = {"pmid": pmid, "author_index": index, "affiliation": affiliation}
+            record.update(result)
+            fp.write(json.dumps(record, ensure_ascii=False) + "\n")
+            n += 1
+    return n
+
+
+def _write_medline_file(args):
+    return args[0], write_medline_file(*args)
+
+
+def parse_medline_directory(directory: str, output_directory: str,
+                            fields: Optional[Iterable[str]] = None,
+                            workers: Optional[int] = None, pattern: str = "*.xml.gz",
+                            batch_size: int = 10000):
+    """
+    Parse every PubMed XML file matching ``pattern`` in ``directory``, one
+    file per worker process, into ``<name>.jsonl.gz`` in
+    ``output_directory``. Yield ``(path, number of records)`` in file name
+    order.
+    """
+    from .parallel import _init_worker
+    from .parse import config_snapshot, select_fields
+
+    fields = select_fields(fields)
+    os.makedirs(output_directory, exist_ok=True)
+    jobs = []
+    for path in sorted(glob.glob(os.path.join(directory, pattern))):
+        name = os.path.basename(path).split(".xml")[0]
+        output_path = os.path.join(output_directory, name + ".jsonl.gz")
+        jobs.append((path, output_path, fields, batch_size))
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(None, config_snapshot())) as pool:
+        yield from pool.map(_write_medline_file, jobs)
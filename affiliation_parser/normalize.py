@@ -0,0 +1,125 @@
+"""
+Rule table for text normalization compiled into a single regular expression
+"""
+from collections import namedtuple
+import re
+from typing import *
+
+NormalizationRule = namedtuple("NormalizationRule", ["pattern", "replacement", "regex"])
+
+
+def _char_pattern(ch: str):
+    # a space in a literal rule also matches a tab
+    return "[ \t]" if ch == " " else re.escape(ch)
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """
+    Build a regular expression matching any of the words, structured as a
+    trie so the longest word wins and shared prefixes are tested once
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    return _node_pattern(trie)
+
+
+def _node_pattern(node: dict) -> str:
+    alternatives = [
+        _char_pattern(ch) + _node_pattern(child)
+        for ch, child in sorted(node.items())
+        if ch
+    ]
+    if not alternatives:
+        return ""
+    if len(alternatives) == 1 and "" not in node:
+        return alternatives[0]
+    pattern = "(?:" + "|".join(alternatives) + ")"
+    return pattern + "?" if "" in node else pattern
+
+
+class TextNormalizer:
+    """
+    Apply a table of normalization rules in one pass over the text.
+
+    Literal rules are merged into a trie shaped expression, so adding more of
+    them keeps the cost per record flat. Regex rules are tried before the
+    literals, in the order they were added; their replacement is either a
+    string or a callable taking the match object. Matches never overlap and
+    replaced text is not rescanned.
+    """
+
+    def __init__(self, rules: Iterable = (), patterns: Iterable = ()):
+        self.literals = {}
+        self.patterns = []
+        self._compiled = None
+        self.add_rules(rules)
+        for pattern, replacement in patterns:
+            self.add_rule(pattern, replacement, regex=True)
+
+    def add_rule(self, pattern: str, replacement: Union[str, Callable] = "", regex: bool = False):
+        """
+        Add normalization rule, ``pattern`` is a literal unless ``regex``
+        """
+        if not pattern:
+            raise ValueError("Normalization rule needs a non-empty pattern")
+        if regex:
+            self.patterns.append(NormalizationRule(re.compile(pattern).pattern, replacement, True))
+        else:
+            if callable(replacement):
+                raise ValueError("Literal normalization rules need a string replacement")
+            self.literals[pattern] = replacement
+        self._compiled = None
+        return self
+
+    def add_rules(self, rules: Iterable):
+        """
+        Add literal ``(pattern, replacement)`` rules or ``NormalizationRule``
+        """
+        for rule in rules:
+            self.add_rule(*rule)
+        return self
+
+    @property
+    def rules(self) -> List[NormalizationRule]:
+        return self.patterns + [
+            NormalizationRule(p, r, False) for p, r in self.literals.items()
+        ]
+
+    def compile(self):
+        """
+        Compile all rules into one regular expression
+        """
+        alternatives = [f"(?P<r{i}>{rule.pattern})" for i, rule in enumerate(self.patterns)]
+        if self.literals:
+            alternatives.append(f"(?P<literal>{trie_pattern(self.literals)})")
+        self._compiled = re.compile("|".join(alternatives)) if alternatives else None
+        return self._compiled
+
+    def _replace(self, match):
+        group = match.lastgroup
+        if group == "literal":
+            text = match.group()
+            replacement = self.literals.get(text)
+            if replacement is None:
+                replacement = self.literals[text.replace("\t", " ")]
+            return replacement
+        replacement = self.patterns[int(group[1:])].replacement
+        return replacement(match) if callable(replacement) else replacement
+
+    def normalize(self, text: str) -> str:
+        """
+        Return text with all rules applied
+        """
+        compiled = self._compiled
+        if compiled is None:
+            if not self.literals and not self.patterns:
+                return text
+            compiled = self.compile()
+        return compiled.sub(self._replace, text)
+
+    def __len__(self):
+        return len(self.literals) + len(self.patterns)
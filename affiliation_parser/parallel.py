@@ -0,0 +1,200 @@
+"""
+Parallel parsing of affiliation strings over a pool of worker processes
+"""
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import *
+from .batch import parse_affil_many
+from .parse import apply_config, config_snapshot, parse_affil, select_fields, warm
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TEXT = "Department of Medicine, Harvard Medical School, Boston, MA 02115, USA"
+
+
+def _init_worker(shared: Optional[Tuple[str, str]] = None, config: Optional[tuple] = None):
+    """
+    Build the parser tables once when a worker process starts, reading
+    city data shared by the parent process and applying its
+    ``config_snapshot`` if given
+    """
+    if shared is not None:
+        from .shared import attach_data
+
+        attach_data(*shared)
+    if config is not None:
+        apply_config(config)
+    warm()
+    parse_affil(WARMUP_TEXT)
+
+
+def _parse_chunk(affil_texts: List[str], fields):
+    return parse_affil_many(affil_texts, fields)
+
+
+def iter_chunks(affil_texts: Iterable[str], chunk_chars: int = 200000,
+                max_chunk_size: int = 10000):
+    """
+    Group strings into lists of about ``chunk_chars`` characters, so long
+    strings make small chunks, and at most ``max_chunk_size`` strings
+    """
+    chunk = []
+    size = 0
+    for affil_text in affil_texts:
+        chunk.append(affil_text)
+        size += len(affil_text)
+        if size >= chunk_chars or len(chunk) >= max_chunk_size:
+            yield chunk
+            chunk = []
+            size = 0
+    if chunk:
+        yield chunk
+
+
+class ParallelParser:
+    """
+    Parse affiliation strings on a pool of worker processes.
+
+    Input is split into chunks by total string length. A bounded number of
+    chunks is in flight at a time, so any size of input can be streamed
+    through ``imap``. Each worker builds the parser tables once when it
+    starts, with the configuration of the parser module when the pool was
+    started (work budget, location priority, loaded tables, ...), and keeps
+    its own result cache for the life of the pool. When a
+    worker dies, the pool is restarted and the unfinished chunks are
+    submitted again, up to ``max_retries`` times each.
+
+    With ``shared`` the city data is read by all workers from one flat copy
+    (see ``shared.share_data``) instead of each worker holding its own
+    Python sets and dicts.
+    """
+
+    def __init__(self, workers: Optional[int] = None, fields: Optional[Iterable[str]] = None,
+                 chunk_chars: int = 200000, max_chunk_size: int = 10000,
+                 max_retries: int = 2, mp_context=None, shared: bool = False):
+        self.workers = workers or os.cpu_count() or 1
+        self.fields = select_fields(fields)
+        self.chunk_chars = chunk_chars
+        self.max_chunk_size = max_chunk_size
+        self.max_retries = max_retries
+        self.mp_context = mp_context
+        self.shared = shared
+        self.restarts = 0
+        self._pool = None
+        self._shared_source = None
+
+    def _start(self):
+        if self._pool is None:
+            if self.shared and self._shared_source is None:
+                from .shared import share_data
+
+                self._shared_source = share_data()
+            self._pool = ProcessPoolExecutor(
+                self.workers, mp_context=self.mp_context, initializer=_init_worker,
+                initargs=(self._shared_source, config_snapshot()),
+            )
+        return self._pool
+
+    def _restart(self):
+        logger.warning("worker process died, restarting pool")
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+        self.restarts += 1
+        return self._start()
+
+    def imap(self, affil_texts: Iterable[str], ordered: bool = True):
+        """
+        Yield parsed results. With ``ordered`` results come in input order,
+        otherwise ``(index, result)`` pairs are yielded as chunks finish.
+        """
+        chunks = iter_chunks(affil_texts, self.chunk_chars, self.max_chunk_size)
+        max_in_flight = 2 * self.workers
+        pending = {}  # future -> (chunk number, first index, chunk, attempts)
+        finished = {}  # chunk number -> results waiting for earlier chunks
+        next_chunk = 0
+        n_chunks = 0
+        start = 0
+        exhausted = False
+        pool = self._start()
+        while True:
+            while not exhausted and len(pending) + len(finished) < max_in_flight:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                job = (n_chunks, start, chunk, 0)
+                pending[pool.submit(_parse_chunk, chunk, self.fields)] = job
+                n_chunks += 1
+                start += len(chunk)
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            completed = []
+            failed = []
+            for future in done:
+                job = pending.pop(future)
+                try:
+                    completed.append((job, future.result()))
+                except BrokenProcessPool:
+                    failed.append(job)
+            if failed:
+                # the pool is unusable, keep what finished and resubmit the rest
+                for future, job in list(pending.items()):
+                    if future.done() and future.exception() is None:
+                        completed.append((job, future.result()))
+                    else:
+                        failed.append(job)
+                pending.clear()
+                pool = self._restart()
+                for number, first, chunk, attempts in sorted(failed, key=lambda job: job[0]):
+                    if attempts >= self.max_retries:
+                        raise BrokenProcessPool(
+                            f"chunk of {len(chunk)} records starting at record {first} "
+                            f"failed {attempts + 1} times"
+                        )
+                    job = (number, first, chunk, attempts + 1)
+                    pending[pool.submit(_parse_chunk, chunk, self.fields)] = job
+
+            for (number, first, _, _), results in completed:
+                if ordered:
+                    finished[number] = results
+                else:
+                    yield from enumerate(results, first)
+            while next_chunk in finished:
+                yield from finished.pop(next_chunk)
+                next_chunk += 1
+
+    def map(self, affil_texts: Iterable[str]) -> list:
+        """
+        Return parsed results in input order
+        """
+        return list(self.imap(affil_texts))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._shared_source is not None:
+            from .shared import release_data
+
+            release_data()
+            self._shared_source = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_affil_parallel(affil_texts: Iterable[str], fields: Optional[Iterable[str]] = None,
+                         workers: Optional[int] = None, **kwargs) -> list:
+    """
+    Parse affiliation strings on ``workers`` processes (all CPUs by default)
+    and return results in input order, see ``ParallelParser`` for options
+    """
+    with ParallelParser(workers, fields, **kwargs) as parser:
+        return parser.map(affil_texts)
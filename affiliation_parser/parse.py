@@ -1,38 +1,257 @@
+import hashlib
 import logging
 import re
 import string
-from unidecode import unidecode
-import numpy as np
+from functools import cached_property, lru_cache
+from typing import FrozenSet, Iterable, List, Optional
 from .keywords import *
-from .data_processor import us_cities, us_state_cities_map, us_city_pop_map
+from .automaton import KeywordAutomaton
+from .location import PRIORITIES, LocationScanner
+from .gazetteer import CityGazetteer, FlatCityGazetteer
+from .tokenizer import tokenize_affil
+from .normalize import TextNormalizer
+from .institutions import AbbreviationTable, CampusTable, InstitutionRecognizer
+from .transliterate import transliterate
+from .result import FIELDS, ParsedAffiliation
+from .cache import LRUCache
+from .budget import CITY_CANDIDATES, LENGTH, SEGMENTS, WorkBudget
+from .data_processor import load_institution_names, load_keyword_table, load_us_cities
+from .zipcodes import ZipTable
 # from nltk.tokenize import WhitespaceTokenizer
-import pandas as pd
-import os
-import logging
 
 logger = logging.getLogger(__name__)
 # w_tokenizer = WhitespaceTokenizer()
 punct_re = re.compile("[{}]".format(re.escape(string.punctuation)))
 
-US_CITIES = us_cities()
-US_CITIES_SET = set(US_CITIES)
-US_CITIES_TOP_2000 = set(US_CITIES[:1000])
-US_CITIES_POP_MAP = us_city_pop_map()
-US_STATE_CITY_MAP = us_state_cities_map()
-MAX_WORDS = max(len(s.split()) for s in US_CITIES)
-logger.warning("finish cities")
+# exact institution names recognized as affiliation (disabled, empty)
+HOSPITAL_NAME = set()
+# known institution names recognized in segments, see use_known_institutions()
+INSTITUTION_RECOGNIZER = None
+INSTITUTION_TABLES = ("grid", "hospital_npi")
 
+TEXT_NORMALIZER = TextNormalizer(NORMALIZATION_RULES, NORMALIZATION_PATTERNS)
+ABBREVIATION_TABLE = AbbreviationTable(UNIVERSITY_ABBR)
+CAMPUS_TABLE = CampusTable(UNIVERSITY_MULTIPLE_CAMPUS)
+LOCATION_PRIORITY = "table"
+# location strings repeat a lot across records, memoize the location stages
+LOCATION_CACHE = LRUCache(maxsize=50000)
+CITY_CACHE = LRUCache(maxsize=50000)
 
-path = "/".join(os.path.abspath(__file__).split('/')[:-1])
-hospital_df = pd.read_csv(path + '/data/hospital_npi.csv')
-grid_df = pd.read_csv(path + '/data/grid.csv')
-HOSPITAL_NAME = set(hospital_df['institution'].tolist())
-HOSPITAL_NAME = HOSPITAL_NAME.union(set(grid_df['institution'].tolist()))
-HOSPITAL_NAME = set()
-logger.warning("finish hospital")
 
+# state of U.S. ZIP code prefixes, cities of ZIP codes with load_zip_cities()
+ZIP_TABLE = ZipTable(ZIP_PREFIX_STATE)
+
+# bumped by every change of the parser configuration, part of the result
+# cache keys; CONFIG_CHANGES describes the changes that alter the output
+CONFIG_VERSION = 0
+CONFIG_CHANGES = []
+
+# optional per-record work limits, see set_work_budget()
+WORK_BUDGET = None
+
+# optional geonames.WorldGazetteer of world place names, see use_world_gazetteer()
+WORLD_GAZETTEER = None
+
+# number of most populated cities searched when no state is known
+TOP_CITIES = 1000
+# artifact read by the flat city tables, see use_shared_data()
+SHARED_ARTIFACT = None
+
+
+class CityTables:
+    """
+    U.S. city data used by ``find_cities``
+    """
+
+    def __init__(self):
+        cities, pop_map, state_map = load_us_cities()
+        self.cities = cities
+        self.cities_set = set(cities)
+        self.top_cities = set(cities[:TOP_CITIES])
+        self.pop_map = pop_map
+        self.state_map = state_map
+        self.max_words = max(len(s.split()) for s in cities)
+        self.gazetteer = CityGazetteer(cities, state_map)
+
+    def find(self, text: str, state: str = None, allowed: FrozenSet[str] = None):
+        """
+        City spans in text, cities of ``state`` or the most populated ones,
+        only cities in ``allowed`` if given
+        """
+        if state:
+            return self.gazetteer.find(text, state=state, allowed=allowed)
+        return self.gazetteer.find(text, allowed=allowed or self.top_cities)
+
+    def population(self, city: str) -> float:
+        return self.pop_map[city]
+
+    def is_top(self, city: str) -> bool:
+        return city in self.top_cities
+
+
+class SharedCityTables(CityTables):
+    """
+    ``CityTables`` read from the flat arrays of a ``DataArtifact``.
+
+    Lookups go through ``FlatCityGazetteer`` and do not touch Python objects
+    of the data, so worker processes forked from the process that loaded it
+    share one copy. The Python lists and maps of ``CityTables`` are only
+    built when accessed.
+    """
+
+    def __init__(self, artifact):
+        self.artifact = artifact
+        self.gazetteer = FlatCityGazetteer(artifact)
+
+    @cached_property
+    def _maps(self):
+        return self.artifact.us_cities()
+
+    cities = property(lambda self: self._maps[0])
+    pop_map = property(lambda self: self._maps[1])
+    state_map = property(lambda self: self._maps[2])
+    cities_set = cached_property(lambda self: set(self.cities))
+    top_cities = cached_property(lambda self: set(self.cities[:TOP_CITIES]))
+    max_words = cached_property(lambda self: max(len(s.split()) for s in self.cities))
+
+    def find(self, text: str, state: str = None, allowed: FrozenSet[str] = None):
+        if state:
+            return self.gazetteer.find(text, state=state, allowed=allowed)
+        if allowed:
+            return self.gazetteer.find(text, allowed=allowed)
+        return self.gazetteer.find(text, top=TOP_CITIES)
+
+    def population(self, city: str) -> float:
+        return self.gazetteer.population(city)
+
+    def is_top(self, city: str) -> bool:
+        return 0 <= self.gazetteer.rank(city) < TOP_CITIES
 
-def string_steps(s: str, max_size=MAX_WORDS):
+
+# the tables below are built on first use or by warm()
+@lru_cache(maxsize=None)
+def city_tables() -> CityTables:
+    from .artifact import load_artifact
+
+    # flat tables of the shared or prebuilt artifact avoid decoding the data
+    artifact = SHARED_ARTIFACT if SHARED_ARTIFACT is not None else load_artifact()
+    if artifact is not None:
+        return SharedCityTables(artifact)
+    return CityTables()
+
+
+def use_shared_data(artifact):
+    """
+    Read U.S. city data from the flat arrays of ``artifact`` (a
+    ``DataArtifact``), None switches back to the prebuilt artifact when it
+    is up to date and to Python sets and dicts otherwise
+    """
+    global SHARED_ARTIFACT
+    SHARED_ARTIFACT = artifact
+    city_tables.cache_clear()
+    config_changed()
+
+
+def config_changed(change: Optional[tuple] = None, setting: bool = False):
+    """
+    Stop using results cached under the previous parser configuration.
+    ``change`` is ``(kind, *values)`` describing a change of the parse
+    output, None is for changes that keep it, e.g. switching to shared city
+    tables. A ``setting`` replaces earlier changes of its kind and is
+    dropped when its value is None (the default).
+    """
+    global CONFIG_VERSION
+    CONFIG_VERSION += 1
+    if change is not None:
+        if setting:
+            CONFIG_CHANGES[:] = [c for c in CONFIG_CHANGES if c[0] != change[0]]
+        if not setting or change[1:] != (None,):
+            CONFIG_CHANGES.append(change)
+    clear_location_cache()
+
+
+def config_version() -> int:
+    return CONFIG_VERSION
+
+
+def config_fingerprint() -> str:
+    """
+    Hash of the changes of the parse output made since import, "" for the
+    default configuration; persistent caches keep results apart by it
+    """
+    if not CONFIG_CHANGES:
+        return ""
+    return hashlib.sha256(repr(CONFIG_CHANGES).encode()).hexdigest()[:16]
+
+
+def cache_namespace(name: str) -> str:
+    """
+    Disk cache namespace of results of ``name`` under the current
+    configuration
+    """
+    fingerprint = config_fingerprint()
+    return f"{name}:{fingerprint}" if fingerprint else name
+
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as fp:
+        return hashlib.sha256(fp.read()).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def keyword_automaton() -> KeywordAutomaton:
+    return KeywordAutomaton.from_keywords({
+        "institute": load_keyword_table("INSTITUTE"),
+        "department": load_keyword_table("DEPARMENT"),
+        "remove": load_keyword_table("REMOVE_INSTITUE"),
+    })
+
+
+@lru_cache(maxsize=None)
+def location_scanner() -> LocationScanner:
+    return LocationScanner(
+        load_keyword_table("COUNTRY"), load_keyword_table("STATES"), load_keyword_table("STATE_MAP")
+    )
+
+
+def warm():
+    """
+    Build all parser tables now instead of on first use, e.g. before
+    forking worker processes
+    """
+    city_tables()
+    keyword_automaton()
+    location_scanner()
+    TEXT_NORMALIZER.compile()
+
+
+# module attributes kept for code using the former eagerly built globals
+_LAZY_ATTRIBUTES = {
+    "US_CITIES": lambda: city_tables().cities,
+    "US_CITIES_SET": lambda: city_tables().cities_set,
+    "US_CITIES_TOP_2000": lambda: city_tables().top_cities,
+    "US_CITIES_POP_MAP": lambda: city_tables().pop_map,
+    "US_STATE_CITY_MAP": lambda: city_tables().state_map,
+    "MAX_WORDS": lambda: city_tables().max_words,
+    "CITY_GAZETTEER": lambda: city_tables().gazetteer,
+    "KEYWORD_AUTOMATON": keyword_automaton,
+    "LOCATION_SCANNER": location_scanner,
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# output fields that need no segment parsing or no location search
+TEXT_FIELDS = frozenset(["full_text", "email", "zipcode"])
+LOCATION_FIELDS = frozenset(["country", "us_state", "us_city"])
+
+
+def string_steps(s: str, max_size=None):
+    max_size = max_size or city_tables().max_words
     string_words = s.upper().replace(',', '').replace('.', '').split()
     final_set = set([])
     for step in range(1, max_size+1):
@@ -53,7 +272,7 @@ def preprocess(text: str):
     if isinstance(text, (type(None), float)):
         text_preprocess = ""
     else:
-        text = unidecode(text).lower()
+        text = transliterate(text).lower()
         text = punct_re.sub(" ", text)  # remove punctuation
         text_preprocess = " ".join(text.split())
     return text_preprocess
@@ -63,83 +282,135 @@ def replace_institution_abbr(affil_text: str):
     """
     Replace abbreviation with full institution string
     """
-    for university_list in UNIVERSITY_ABBR:
-        for university in university_list:
-            if university in affil_text:
-                affil_text = re.sub(university, university_list[0], affil_text)
-                return affil_text
-    return affil_text
+    return ABBREVIATION_TABLE.replace(affil_text)
 
 
 def append_institution_city(affil: str, location: str):
     """
     Append city to university that has multiple campuses if exist
     """
-    for university_list in UNIVERSITY_MULTIPLE_CAMPUS:
-        if university_list[0] in affil.lower():
-            for city in university_list[1::]:
-                if city in location.lower() and not city in affil.lower():
-                    affil = affil + " " + city
-                    return affil
-    return affil
+    return CAMPUS_TABLE.append_city(affil, location)
+
+
+def load_institution_abbreviations(path: str):
+    """
+    Load CSV file with rows ``full name, abbreviation, ...`` used by
+    ``replace_institution_abbr``
+    """
+    ABBREVIATION_TABLE.load_csv(path)
+    config_changed(("abbreviations", file_digest(path)))
+
+
+def load_multiple_campus(path: str):
+    """
+    Load CSV file with rows ``university, campus city, ...`` used by
+    ``append_institution_city``
+    """
+    CAMPUS_TABLE.load_csv(path)
+    config_changed(("campuses", file_digest(path)))
+
+
+def add_normalization_rules(rules: Iterable, regex: bool = False):
+    """
+    Add ``(pattern, replacement)`` rules applied by ``clean_text``, with
+    ``regex`` a replacement may be a plain function taking the match
+    """
+    rules = [tuple(rule) for rule in rules]
+    described = tuple((pattern, describe_replacement(replacement)) for pattern, replacement in rules)
+    for pattern, replacement in rules:
+        TEXT_NORMALIZER.add_rule(pattern, replacement, regex=regex)
+    config_changed(("normalization", regex, described))
+
+
+def _code_digest(code) -> str:
+    digest = hashlib.sha256(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        digest.update((_code_digest(const) if hasattr(const, "co_code") else repr(const)).encode())
+    return digest.hexdigest()[:16]
+
+
+def describe_replacement(replacement):
+    """
+    Description of a normalization rule replacement that stays the same
+    across processes, a callable by its name and bytecode. Callables whose
+    result depends on captured state cannot be described and are rejected.
+    """
+    if not callable(replacement):
+        return replacement
+    code = getattr(replacement, "__code__", None)
+    if code is None or replacement.__closure__ or replacement.__defaults__:
+        raise TypeError("Normalization rule replacements must be strings or plain functions "
+                        "without closures or default arguments")
+    return (replacement.__module__, replacement.__qualname__, _code_digest(code))
 
 
 def clean_text(affil_text: str):
     """
     Given affiliation text with abbreviation, clean that text
     """
-    affil_text = affil_text.strip()
-    affil_text = re.sub("\t", " ", affil_text)
-    affil_text = re.sub("Dept. ", "Department ", affil_text)
-    affil_text = re.sub("Surg. ", "Surgery ", affil_text)
-    affil_text = re.sub("Univ. ", "University ", affil_text)
-    affil_text = affil_text[2:] if affil_text.startswith("2 ") else affil_text
-    affil_text = affil_text[3:] if affil_text.startswith("2. ") else affil_text
-    affil_text = re.sub(r"\*", " ", affil_text)
-    affil_text = re.sub(";", "", affil_text)
-    affil_text = re.sub("E-mail:", "", affil_text)
-    affil_text = re.sub("email:", "", affil_text)
-    affil_text = re.sub("P.O. Box", "", affil_text)
+    affil_text = TEXT_NORMALIZER.normalize(affil_text.strip())
     affil_text = replace_institution_abbr(affil_text)
     return affil_text.strip()
 
 
-def find_country(location: str):
+def tag_segments(segments: List[str], automaton: KeywordAutomaton = None):
+    """
+    Scan each segment once and return the keyword labels found in it
+    """
+    automaton = automaton or keyword_automaton()
+    return [automaton.labels(a.lower()) for a in segments]
+
+
+def find_country(location: str, priority: str = "table"):
     """
     Find country from string
     """
-    location_lower = location.lower()
-    for country in COUNTRY:
-        for c in country:
-            if c in location_lower:
-                return country[0]
-    return ""
+    return location_scanner().find_country(location, priority)
 
 
-def find_state(affil_text: str):
+def find_state(affil_text: str, priority: str = "table"):
     """
     Get U.S. state info. 
     """
-    for state in STATES:
-        if state in affil_text: 
-            stripped_state = state.strip()
-            if len(stripped_state) == 2:
-                # For state abreviations, we require that they are not followed by some alphachar
-                if not re.search(f"{state}(?![a-zA-Z])", affil_text): continue 
-                return stripped_state, stripped_state
-            else:
-                return STATE_MAP[stripped_state], stripped_state
-    return "", None
-
-
-def find_cities(text: str, state = None, extracted_state = None):
-    cities = US_CITIES_SET.intersection(string_steps(text))
-    if state:
-        city_ops = cities.intersection(US_STATE_CITY_MAP[state])
-    else:
-        city_ops = cities.intersection(US_CITIES_TOP_2000)
+    return location_scanner().find_state(affil_text, priority)
+
+
+def find_cities(text: str, state = None, extracted_state = None, allowed = None):
+    """
+    Find U.S. city in text, only among ``allowed`` cities if given
+    """
+    return search_cities(text, state, extracted_state, allowed)[0]
+
 
-    city_ops = {x for x in city_ops }
+def search_cities(text: str, state = None, extracted_state = None, allowed = None):
+    """
+    Return ``(city, truncated)``, truncated when more cities than the work
+    budget allows were found. Results are memoized in ``CITY_CACHE``.
+    """
+    key = (text, state, extracted_state, allowed)
+    found = CITY_CACHE.get(key)
+    if found is None:
+        found = _find_cities(text, state, extracted_state, allowed)
+        CITY_CACHE.put(key, found)
+    return found
+
+
+def _find_cities(text: str, state = None, extracted_state = None, allowed = None):
+    tables = city_tables()
+    spans = tables.find(text, state, allowed)
+    truncated = False
+
+    # first position of each candidate city
+    city_pos = {}
+    for span in spans:
+        city_pos.setdefault(span.city, span.start)
+    max_candidates = WORK_BUDGET and WORK_BUDGET.max_city_candidates
+    if max_candidates is not None and len(city_pos) > max_candidates:
+        # the filter below is quadratic in candidates, keep the first ones
+        city_pos = dict(list(city_pos.items())[:max_candidates])
+        truncated = True
+    city_ops = set(city_pos)
     final_city_ops = set([])
     # Filter out cities that are part of other cities 
     for city in city_ops: 
@@ -152,19 +423,47 @@ def find_cities(text: str, state = None, extracted_state = None):
     city_ops = final_city_ops
     # Option 1: No cities
     if not city_ops:
-        return ""
+        return "", truncated
 
     # Option 2: Single city
     if len(city_ops) == 1:
-        return city_ops.pop()
+        return city_ops.pop(), truncated
     # If we didn't include extracted state + len of options is greater than 1, go back
     elif not extracted_state:
-        return ""
+        return "", truncated
     else:
         state_loc = text.rfind(extracted_state)
-        distances = {c: state_loc - text.upper().find(c) for c in city_ops}
+        distances = {c: state_loc - city_pos[c] for c in city_ops}
         distances = {c: v if v>= 1 else 5000 for c, v in distances.items()}
-        return max(city_ops, key=lambda x: (-distances.get(x, 0), len(x.split()), US_CITIES_POP_MAP[x]))
+        city = max(city_ops, key=lambda x: (-distances.get(x, 0), len(x.split()), tables.population(x)))
+        return city, truncated
+
+
+def use_world_gazetteer(gazetteer):
+    """
+    Look up cities worldwide with ``find_world_city`` in a
+    ``geonames.WorldGazetteer`` or the path of its file, None switches it off
+    """
+    global WORLD_GAZETTEER
+    if isinstance(gazetteer, str):
+        from .geonames import WorldGazetteer
+
+        gazetteer = WorldGazetteer(gazetteer)
+    WORLD_GAZETTEER = gazetteer
+
+
+def find_world_city(location: str, country: str = None, min_population: int = 0) -> str:
+    """
+    Return the most populated place named in location, within ``country``
+    (ISO code or name) if given, "" if there is none or no world gazetteer
+    is set
+    """
+    if WORLD_GAZETTEER is None:
+        return ""
+    spans = WORLD_GAZETTEER.find(location, country or None, min_population)
+    if not spans:
+        return ""
+    return max(spans, key=lambda span: span.city.population).city.name
 
 
 def check_country(affil_text: str):
@@ -179,7 +478,7 @@ def check_country(affil_text: str):
 
 def parse_email(affil_text: str):
     """Find email from given string"""
-    match = re.search(r"[\w\.-]+@[\w\.-]+", affil_text)
+    match = re.search(r"[\w\.\+-]+@[\w\.-]+", affil_text)
     if match is not None:
         email = match.group()
         if email[-1] == ".":
@@ -207,108 +506,354 @@ def parse_zipcode(affil_text: str):
     return zip_code_group
 
 
-def parse_location(affil_text, location):
+def select_fields(fields: Optional[Iterable[str]]) -> Optional[FrozenSet[str]]:
     """
-    Parse location and country from affiliation string
+    Validate requested output fields, ``None`` means all fields
     """
-    location = re.sub(r"\.", "", location).strip()
-    country = find_country(location)
-    if not country:
-        country = find_country(affil_text)
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = (fields,)
+    fields = frozenset(fields)
+    unknown = fields.difference(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields {sorted(unknown)}, expected any of {FIELDS}")
+    return fields
+
+
+def project_fields(result: ParsedAffiliation, fields: Optional[FrozenSet[str]]):
+    """
+    Drop fields that were not requested from result
+    """
+    if fields is not None:
+        for field in FIELDS:
+            if field not in fields and field in result:
+                delattr(result, field)
+    return result
 
-    # First try state from location, if no luck, try from full text
-    state, extracted_state = find_state(location)
+
+def scan_location(location: str):
+    """
+    Return ``(country, state, extracted_state)`` found in location string,
+    memoized in ``LOCATION_CACHE``
+    """
+    key = (location, LOCATION_PRIORITY)
+    found = LOCATION_CACHE.get(key)
+    if found is None:
+        matches = location_scanner().scan(location)
+        country = location_scanner().select_country(matches, LOCATION_PRIORITY)
+        state, extracted_state = location_scanner().select_state(matches, LOCATION_PRIORITY)
+        found = (country, state, extracted_state)
+        LOCATION_CACHE.put(key, found)
+    return found
+
+
+def set_location_priority(priority: str):
+    """
+    Pick country and state among several matches by ``"table"`` order
+    (default) or the ``"last"`` one in the text
+    """
+    global LOCATION_PRIORITY
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority {priority!r}, expected one of {PRIORITIES}")
+    LOCATION_PRIORITY = priority
+    config_changed(("location_priority", None if priority == "table" else priority), setting=True)
+
+
+def load_zip_cities(path: str, **kwargs):
+    """
+    Load the cities of U.S. ZIP codes from a CSV or GeoNames postal code
+    file, see ``ZipTable.load_csv``. City search is then restricted to the
+    cities of the ZIP code found in an affiliation.
+    """
+    ZIP_TABLE.load_csv(path, **kwargs)
+    config_changed(("zip_cities", file_digest(path), tuple(sorted(kwargs.items()))))
+    logger.debug("loaded cities of %d ZIP codes", len(ZIP_TABLE))
+
+
+def use_known_institutions(enabled: bool = True, tables: Iterable[str] = INSTITUTION_TABLES,
+                           spans: bool = True, min_tokens: int = 2, names: Iterable[str] = ()):
+    """
+    Recognize segments naming a known institution of the bundled ``tables``
+    and of ``names`` as institutions, including segments where the name is
+    a span of at least ``min_tokens`` words when ``spans`` is set. Off by
+    default, ``enabled=False`` switches it off again. Workers of
+    ``ParallelParser`` get the setting from ``config_snapshot``.
+    """
+    global INSTITUTION_RECOGNIZER
+    if enabled:
+        tables, names = tuple(tables), tuple(names)
+        recognizer = InstitutionRecognizer(names, spans=spans, min_tokens=min_tokens)
+        for table in tables:
+            recognizer.extend(load_institution_names(table))
+        INSTITUTION_RECOGNIZER = recognizer
+        logger.debug("recognizing %d known institution names", len(recognizer))
+        config_changed(("known_institutions", (tables, spans, min_tokens, names)), setting=True)
+    else:
+        INSTITUTION_RECOGNIZER = None
+        config_changed(("known_institutions", None), setting=True)
+    return INSTITUTION_RECOGNIZER
+
+
+def set_work_budget(budget: Optional[WorkBudget] = None, **limits):
+    """
+    Limit the work spent on each record, with a ``WorkBudget`` or its
+    keyword arguments, e.g. ``set_work_budget(max_length=2000)``. Without
+    arguments the limits are removed. Workers of ``ParallelParser`` get the
+    limits from ``config_snapshot``.
+    """
+    global WORK_BUDGET
+    WORK_BUDGET = WorkBudget(**limits) if limits else budget
+    budget = WORK_BUDGET
+    config_changed(("work_budget", budget and (
+        budget.max_length, budget.max_segments, budget.max_city_candidates
+    )), setting=True)
+    return WORK_BUDGET
+
+
+def config_snapshot() -> tuple:
+    """
+    Picklable copy of the parser configuration changed at runtime, for
+    ``apply_config`` in worker processes, which start from the defaults
+    under spawn. The loaded tables are copied, known institutions are
+    rebuilt from their settings.
+    """
+    return list(CONFIG_CHANGES), (TEXT_NORMALIZER, ABBREVIATION_TABLE, CAMPUS_TABLE, ZIP_TABLE)
+
+
+def apply_config(snapshot: tuple):
+    """
+    Restore the configuration of ``config_snapshot``, nothing is done when
+    it is already in place, e.g. in a forked process
+    """
+    global TEXT_NORMALIZER, ABBREVIATION_TABLE, CAMPUS_TABLE, ZIP_TABLE
+    changes, tables = snapshot
+    if changes == CONFIG_CHANGES:
+        return
+    TEXT_NORMALIZER, ABBREVIATION_TABLE, CAMPUS_TABLE, ZIP_TABLE = tables
+    settings = {change[0]: change[1] for change in changes}
+    set_location_priority(settings.get("location_priority") or "table")
+    limits = settings.get("work_budget")
+    set_work_budget(limits and WorkBudget(*limits))
+    if settings.get("known_institutions"):
+        use_known_institutions(True, *settings["known_institutions"])
+    else:
+        use_known_institutions(False)
+    CONFIG_CHANGES[:] = changes
+    config_changed()
+
+
+def truncated_records() -> List[tuple]:
+    """
+    Return ``(text, reasons)`` of the last records truncated by the work
+    budget
+    """
+    return list(WORK_BUDGET.records) if WORK_BUDGET is not None else []
+
+
+def location_cache_stats() -> dict:
+    """
+    Return hit, miss and eviction counts of the location and city caches
+    """
+    return {"location": LOCATION_CACHE.stats(), "city": CITY_CACHE.stats()}
+
+
+def clear_location_cache():
+    """
+    Clear the location and city caches, needed after changing
+    ``location_scanner()`` or ``city_tables()`` directly; the setters of
+    this module call ``config_changed`` which clears them
+    """
+    LOCATION_CACHE.clear()
+    CITY_CACHE.clear()
+
+
+def parse_location(affil_text, location, fields=None, us_zipcode=""):
+    """
+    Parse location and country from affiliation string, ``fields`` restricts
+    the search to the given location fields.
+
+    ``us_zipcode`` is a 5 digit ZIP code found in the affiliation. Its
+    state is used when the location names the U.S. but no state, unless
+    the location names a city of another state, and replaces a state found
+    by a name that is part of a city of the ZIP state, e.g. "Washington"
+    in "Washington 20057", when no city of the named state is found. When the cities of ZIP codes are loaded, the
+    full text is only searched for the cities of the ZIP code.
+    """
+    location = re.sub(r"\.", "", location).strip()
+    dict_location = {"location": location.strip()}
+    if fields is not None and fields.isdisjoint(LOCATION_FIELDS):
+        return dict_location
+
+    # scan location once for both country and state, fall back to full text
+    country, state, extracted_state = scan_location(location)
+    zip_state = ZIP_TABLE.state(us_zipcode)
+    if zip_state and state != zip_state and (state or country == "united states of america"):
+        # the search of the ZIP state is memoized and reused for the city below
+        zip_city = find_cities(location, zip_state, None)
+        if state:
+            # a state name that is part of a city of the ZIP state, e.g.
+            # "Washington" or "Kansas City", and no city of the named state
+            if (len(extracted_state) > 2 and extracted_state.upper() in zip_city
+                    and not find_cities(affil_text, state, extracted_state)):
+                state = zip_state
+        elif zip_city or not find_cities(location, None, None):
+            # trust the ZIP code unless the location names a city of another state
+            state = zip_state
+    # First try state from location, if no luck, try from full text; the
+    # country is settled by the state when there is one
     if not state:
-        state, extracted_state = find_state(affil_text)
-    
-    city = find_cities(location, state, None)
-    if not city:
-        city = find_cities(affil_text, state, extracted_state)
+        matches = location_scanner().scan(affil_text)
+        if not country:
+            country = location_scanner().select_country(matches, LOCATION_PRIORITY)
+        if not state:
+            state, extracted_state = location_scanner().select_state(matches, LOCATION_PRIORITY)
+
+    # country only depends on the city when neither country nor state is found
+    city = ""
+    truncated = False
+    if fields is None or "us_city" in fields or ("country" in fields and not (state or country)):
+        zip_cities = ZIP_TABLE.cities(us_zipcode) if state and state == zip_state else None
+        if zip_cities:
+            # the full text is only searched for the cities of the ZIP code
+            city = find_cities(location, state, None, zip_cities) or find_cities(
+                affil_text, state, None, zip_cities
+            )
+        if not city:
+            city, truncated = search_cities(location, state, None)
+        if not city and not zip_cities:
+            city, truncated = search_cities(affil_text, state, extracted_state)
+        if truncated:
+            dict_location["truncated"] = True
 
     # If we extracted a state, then we're probably in the us
-    if state or (not country and city in US_CITIES_TOP_2000):
+    if state or (not country and city_tables().is_top(city)):
         country = "united states of america"
 
-    dict_location = {
-        "location": location.strip(), 
+    dict_location.update({
         "country": country.strip(),
         "us_state": state,
         "us_city": city,
-    }
+    })
     return dict_location
 
 
-def parse_affil(affil_text):
+def _is_place(segment: str) -> bool:
+    """
+    Whether segment is only a U.S. city, U.S. state or country name, e.g.
+    "Phoenix" which is also the name of a known institution
+    """
+    segment = segment.strip()
+    if segment.upper().replace(".", "") in city_tables().gazetteer:
+        return True
+    return any(m.start == 0 and m.end == len(segment) for m in location_scanner().scan(segment))
+
+
+def parse_affil(affil_text, fields=None):
     """
     Parse affiliation string to institution and department
+
+    ``fields`` is an optional collection of output fields to compute, the
+    stages the other fields need are skipped and only the requested fields
+    are returned
+
+    Under a work budget (see ``set_work_budget``) a record exceeding it gets
+    a partial result with ``result.truncated`` set
     """
-    affil_text = unidecode(affil_text)
+    fields = select_fields(fields)
+    budget = WORK_BUDGET
+    truncated = set()
+    source_text = affil_text
+    if budget is not None:
+        affil_text = budget.cut(affil_text)
+        if len(affil_text) < len(source_text):
+            truncated.add(LENGTH)
+    affil_text = transliterate(affil_text)
     affil_text = clean_text(affil_text)
-    email = parse_email(affil_text)
-    zip_code = parse_zipcode(affil_text)
-    affil_text = re.sub(email, "", affil_text)
-    affil_text = re.sub(zip_code, "", affil_text)
-
-    affil_list = re.split(r",\s|\/", affil_text)
+    tokens = tokenize_affil(affil_text)
+    email = tokens.email
+    zip_code = tokens.zipcode
+    affil_text = tokens.full_text
+
+    full_text = affil_text.strip()
+    if fields is not None and fields.issubset(TEXT_FIELDS):
+        result = ParsedAffiliation(full_text=full_text, email=email, zipcode=zip_code)
+        return _finish(project_fields(result, fields), source_text, truncated)
+
+    affil_list = tokens.segments
+    if budget is not None and budget.max_segments is not None and len(affil_list) > budget.max_segments:
+        affil_list = affil_list[:budget.max_segments]
+        truncated.add(SEGMENTS)
+    affil_tags = tag_segments(affil_list)
+    recognizer = INSTITUTION_RECOGNIZER
     affil = list()
-    location = list()
-    departments = list()
+    affil_index = list()
+    location_start = len(affil_list)
 
     for i, a in enumerate(affil_list):
-        for ins in INSTITUTE:
-            if ins in a.lower() and (not a in affil):
-                affil.append(a)
-                location = affil_list[i + 1:]
-        
+        if "institute" in affil_tags[i] and (not a in affil):
+            affil.append(a)
+            affil_index.append(i)
+            location_start = i + 1
+
         if a.upper() in HOSPITAL_NAME and (not a in affil):
             affil.append(a)
-            location = affil_list[i + 1:]
-    
+            affil_index.append(i)
+            location_start = i + 1
+
+        if recognizer is not None and (not a in affil) and recognizer.find(a) and not _is_place(a):
+            affil.append(a)
+            affil_index.append(i)
+            location_start = i + 1
+
     if len(affil) == 0:
-        location = affil_list[-3:]
+        location_start = max(len(affil_list) - 3, 0)
 
     # remove unwanted from affliation list and location list
-    pop_index = list()
-    for i, a in enumerate(affil):
-        for rm in REMOVE_INSTITUE:
-            if rm in a.lower() and (not "university" in a.lower()):
-                pop_index.append(i)
-    affil = np.delete(affil, list(set(pop_index))).tolist()
-
-    pop_index = list()
-    for i, l in enumerate(location):
-        for rm in DEPARMENT:
-            if rm in l.lower():
-                pop_index.append(i)
-    location = np.delete(location, list(set(pop_index))).tolist()
-
-    affil = affil
-    location = ", ".join(location)
+    affil = [
+        a for i, a in zip(affil_index, affil)
+        if not ("remove" in affil_tags[i] and (not "university" in a.lower()))
+    ]
+    location = ", ".join(
+        affil_list[i] for i in range(location_start, len(affil_list))
+        if "department" not in affil_tags[i]
+    )
     if location == "":
         location = affil_text.split(", ")[-1]
     # location = re.sub(r"\([^)]*\)", "", location).strip()
 
+    department = list()
     for i, a in enumerate(affil_list):
-        for dep in DEPARMENT:
-            if dep in a.lower() and (not a in departments):
-                departments.append(affil_list[i])
-    department = departments
-
-    dict_location = parse_location(affil_text.strip(), location)
-    affil = [append_institution_city(af, dict_location["location"]) for af in affil]
-
-    dict_out = {
-        "full_text": affil_text.strip(),
-        "department": department,
-        "institution": affil,
-        "email": email,
-        "zipcode": zip_code,
-    }
-    dict_out.update(dict_location)
-    if dict_out["country"] == "":
-        dict_out["country"] = check_country(affil_text)  # check country
-    return dict_out
-
+        if "department" in affil_tags[i] and (not a in department):
+            department.append(a)
+
+    dict_location = parse_location(full_text, location, fields, tokens.us_zipcode)
+    if fields is None or "institution" in fields:
+        affil = [append_institution_city(af, dict_location["location"]) for af in affil]
+
+    if dict_location.get("country") == "":
+        dict_location["country"] = check_country(affil_text)  # check country
+    if dict_location.pop("truncated", False):
+        truncated.add(CITY_CANDIDATES)
+    result = ParsedAffiliation(
+        full_text=full_text,
+        department=department,
+        institution=affil,
+        email=email,
+        zipcode=zip_code,
+        **dict_location,
+    )
+    return _finish(project_fields(result, fields), source_text, truncated)
+
+
+def _finish(result: ParsedAffiliation, affil_text: str, truncated: set):
+    """
+    Flag and report a result of a record that hit the work budget
+    """
+    if truncated:
+        result.truncated = True
+        WORK_BUDGET.report(affil_text, truncated)
+    return result
 
 if __name__ == '__main__':
     print(parse_affil("New York, New York")["us_city"])
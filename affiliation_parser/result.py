@@ -0,0 +1,118 @@
+"""
+Compact result type returned by parse_affil
+"""
+from collections.abc import MutableMapping
+
+# output fields of parse_affil, in output order
+FIELDS = (
+    "full_text",
+    "department",
+    "institution",
+    "email",
+    "zipcode",
+    "location",
+    "country",
+    "us_state",
+    "us_city",
+)
+_FIELD_SET = frozenset(FIELDS)
+
+
+class ParsedAffiliation(MutableMapping):
+    """
+    Parsed affiliation fields stored in slots instead of a per-record dict.
+
+    Behaves like the dictionary ``parse_affil`` used to return: keys can be
+    read, assigned, deleted and added (``result["score"] = 0.9``), and
+    ``copy``, ``update``, ``pop``, ``get`` and ``setdefault`` work as on a
+    dict. Fields left out by ``parse_affil(..., fields=...)`` are not set and
+    not part of the mapping. Keys other than ``FIELDS`` go to a dict created
+    on first use. ``truncated`` is set, outside the mapping, when the record
+    hit the work budget and the result is partial.
+
+    It is not a ``dict`` subclass: ``json.dumps`` needs ``to_dict()`` (or
+    ``default=ParsedAffiliation.to_dict``) and ``pandas.DataFrame`` sorts the
+    columns of mappings that are not dicts, pass ``to_dict()`` results or
+    use ``parse_frame``.
+    """
+
+    __slots__ = FIELDS + ("_truncated", "_extra")
+
+    def __init__(self, **fields):
+        for field, value in fields.items():
+            self[field] = value
+
+    @property
+    def truncated(self) -> bool:
+        return getattr(self, "_truncated", False)
+
+    @truncated.setter
+    def truncated(self, value: bool):
+        self._truncated = value
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return getattr(self, "_extra", {})[key]
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            setattr(self, key, value)
+        else:
+            try:
+                self._extra[key] = value
+            except AttributeError:
+                self._extra = {key: value}
+
+    def __delitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        else:
+            del getattr(self, "_extra", {})[key]
+
+    def __iter__(self):
+        for field in FIELDS:
+            if hasattr(self, field):
+                yield field
+        yield from getattr(self, "_extra", ())
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        if key in _FIELD_SET:
+            return hasattr(self, key)
+        return key in getattr(self, "_extra", ())
+
+    def to_dict(self) -> dict:
+        return {key: self[key] for key in self}
+
+    def copy(self) -> "ParsedAffiliation":
+        """
+        Return a shallow copy, e.g. of a cached result before modifying it
+        """
+        result = self.__class__(**self.to_dict())
+        if self.truncated:
+            result.truncated = True
+        return result
+
+    __copy__ = copy
+
+    def __reduce__(self):
+        return (self.__class__, (), (self.to_dict(), self.truncated))
+
+    def __setstate__(self, state):
+        fields, truncated = state
+        for key, value in fields.items():
+            self[key] = value
+        if truncated:
+            self.truncated = True
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.to_dict()!r})"
@@ -0,0 +1,93 @@
+"""
+Parser data shared between worker processes as flat buffers
+"""
+import atexit
+from multiprocessing import shared_memory
+from typing import *
+from .artifact import DEFAULT_PATH, DataArtifact, compile_artifact, load_artifact
+from .disk_cache import data_fingerprint
+from .parse import use_shared_data
+
+
+class SharedData:
+    """
+    Data artifact held in a ``multiprocessing.shared_memory`` block.
+
+    Without ``name`` the artifact is compiled from the bundled data into a
+    new block owned by this object and removed by ``close``. With ``name``
+    an existing block is attached, e.g. in a spawned worker.
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        self.owner = name is None
+        if self.owner:
+            data = compile_artifact().to_bytes(data_fingerprint())
+            self.shm = shared_memory.SharedMemory(create=True, size=len(data))
+            self.shm.buf[:len(data)] = data
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.artifact = DataArtifact(None, buffer=self.shm.buf)
+
+    def close(self):
+        self.artifact.close()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# SharedData created or attached by this process
+_SHARED = None
+
+
+def share_data(path: str = DEFAULT_PATH) -> Tuple[str, str]:
+    """
+    Switch this process to flat city tables that forked or spawned workers
+    can share, return ``(kind, source)`` to pass to ``attach_data`` in
+    workers.
+
+    The artifact file at ``path`` is memory-mapped when it is up to date,
+    its pages are shared through the page cache. Otherwise the artifact is
+    built into a shared memory block, freed by ``release_data``.
+    """
+    global _SHARED
+    artifact = load_artifact(path)
+    if artifact is not None:
+        use_shared_data(artifact)
+        return "file", path
+    _SHARED = SharedData()
+    use_shared_data(_SHARED.artifact)
+    return "shared_memory", _SHARED.name
+
+
+def attach_data(kind: str, source: str):
+    """
+    Use the data shared by ``share_data`` in a worker process
+    """
+    global _SHARED
+    if kind == "file":
+        use_shared_data(load_artifact(source))
+    elif _SHARED is None or _SHARED.name != source:
+        # forked workers already hold the block of the parent
+        _SHARED = SharedData(source)
+        use_shared_data(_SHARED.artifact)
+        # views on the block must be released before it can be closed
+        atexit.register(release_data)
+
+
+def release_data():
+    """
+    Switch back to the Python city tables and free the shared memory block
+    created by ``share_data``
+    """
+    global _SHARED
+    use_shared_data(None)
+    if _SHARED is not None:
+        _SHARED.close()
+        _SHARED = None
@@ -0,0 +1,103 @@
+"""
+Single-pass tokenizer that splits affiliation text into typed spans
+"""
+from collections import namedtuple
+import re
+from typing import *
+
+EMAIL = "email"
+ZIPCODE = "zipcode"
+SEPARATOR = "separator"
+SEGMENT = "segment"
+
+Span = namedtuple("Span", ["kind", "start", "end"])
+AffilTokens = namedtuple(
+    "AffilTokens", ["text", "full_text", "email", "zipcode", "spans", "segments", "us_zipcode"]
+)
+
+# alternatives are tried in order at each position, so an email always wins
+# over digits it contains and a 5 digit zip code over a 3 digit one
+token_re = re.compile(
+    r"(?P<email>[\w\.\+-]+@[\w\.-]+)"
+    r"|(?P<zipcode5>\d{5}-?(?:\d{4})?)"
+    r"|(?P<zipcode>\d{3}-?(?:\d{4})?)"
+    r"|(?P<separator>,\s|/)"
+)
+
+
+def _cut(text: str, start: int, end: int, removed: List[Span]):
+    """
+    Return text[start:end] without the removed spans
+    """
+    pieces = []
+    for _, r_start, r_end in removed:
+        if r_end <= start or r_start >= end:
+            continue
+        pieces.append(text[start:r_start])
+        start = r_end
+    pieces.append(text[start:end])
+    return "".join(pieces)
+
+
+def tokenize_affil(text: str) -> AffilTokens:
+    """
+    Scan affiliation text once and split it into email, zip code, separator
+    and segment spans.
+
+    Every occurrence of the first email and zip code found is removed from
+    the segments and ``full_text``, the same way ``parse_affil`` has always
+    dropped them. A zip code is only reported when there is no 5 digit
+    number in the text. ``us_zipcode`` holds the first five digits of the
+    first 5 digit number, a ZIP code candidate for the location search.
+    """
+    emails = []
+    zipcodes = []
+    has_zipcode5 = False
+    us_zipcode = ""
+    separators = []
+    for match in token_re.finditer(text):
+        kind = match.lastgroup
+        if kind == EMAIL:
+            start, end = match.span()
+            if text[end - 1] == ".":
+                end -= 1
+            emails.append(Span(EMAIL, start, end))
+        elif kind == "zipcode5":
+            if not has_zipcode5:
+                us_zipcode = match.group()[:5]
+            has_zipcode5 = True
+        elif kind == ZIPCODE:
+            zipcodes.append(Span(ZIPCODE, *match.span()))
+        else:
+            separators.append(Span(SEPARATOR, *match.span()))
+
+    if has_zipcode5:
+        zipcodes = []
+    # every occurrence of the first email and zip code is removed
+    email = text[emails[0].start:emails[0].end] if emails else ""
+    zipcode = text[zipcodes[0].start:zipcodes[0].end] if zipcodes else ""
+    removed = [s for s in emails if text[s.start:s.end] == email]
+    removed += [s for s in zipcodes if text[s.start:s.end] == zipcode]
+    removed.sort(key=lambda s: s.start)
+
+    spans = []
+    segments = []
+    start = 0
+    for separator in separators + [Span(SEPARATOR, len(text), len(text))]:
+        spans.append(Span(SEGMENT, start, separator.start))
+        segments.append(_cut(text, start, separator.start, removed))
+        if separator.start < len(text):
+            spans.append(separator)
+        start = separator.end
+    spans.extend(removed)
+    spans.sort(key=lambda s: (s.start, s.end))
+
+    return AffilTokens(
+        text=text,
+        full_text=_cut(text, 0, len(text), removed),
+        email=email,
+        zipcode=zipcode,
+        spans=spans,
+        segments=segments,
+        us_zipcode=us_zipcode,
+    )
@@ -0,0 +1,68 @@
+"""
+Transliteration to ASCII with a fast path for ASCII text and a token cache
+"""
+from functools import lru_cache
+import re
+from unidecode import unidecode
+
+non_ascii_token_re = re.compile(r"\S*[^\x00-\x7f]\S*")
+
+
+class Transliterator:
+    """
+    Drop-in replacement for ``unidecode`` on affiliation strings.
+
+    ASCII strings are returned as is. Otherwise only the whitespace separated
+    tokens containing non-ASCII characters are transliterated, through a
+    bounded LRU cache, since affiliations repeat a small vocabulary of
+    accented names. ``unidecode`` maps characters independently, so the
+    result is the same as transliterating the whole string.
+    """
+
+    def __init__(self, maxsize: int = 65536):
+        self.maxsize = maxsize
+        self.ascii = 0
+        self._token = lru_cache(maxsize=maxsize)(unidecode)
+
+    def __call__(self, text: str) -> str:
+        if text.isascii():
+            self.ascii += 1
+            return text
+        return non_ascii_token_re.sub(self._replace, text)
+
+    def _replace(self, match):
+        return self._token(match.group())
+
+    def stats(self) -> dict:
+        """
+        Return number of ASCII fast path calls and token cache statistics
+        """
+        info = self._token.cache_info()
+        return {
+            "ascii": self.ascii,
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+        }
+
+    def clear(self):
+        """
+        Clear token cache and reset counters
+        """
+        self.ascii = 0
+        self._token.cache_clear()
+
+
+TRANSLITERATOR = Transliterator()
+
+
+def transliterate(text: str) -> str:
+    """
+    Transliterate text to ASCII using the shared cached transliterator
+    """
+    return TRANSLITERATOR(text)
+
+
+def transliteration_stats() -> dict:
+    return TRANSLITERATOR.stats()
@@ -0,0 +1,65 @@
+"""
+U.S. ZIP code lookup of state and candidate cities
+"""
+import csv
+from typing import *
+
+
+class ZipTable:
+    """
+    State of a 5 digit ZIP code from its 3 digit prefix, in a 1000 entry
+    list, and optionally the cities of each ZIP code loaded from a local
+    file, e.g. a GeoNames ``US.txt`` postal code dump
+    """
+
+    def __init__(self, prefixes: Iterable[Tuple[str, str, str]] = ()):
+        self.prefix_state = [""] * 1000
+        self.zip_cities = {}
+        for first, last, state in prefixes:
+            for prefix in range(int(first), int(last) + 1):
+                self.prefix_state[prefix] = state
+
+    def state(self, zipcode: str) -> str:
+        """
+        Return state of ZIP code, "" if it is not a valid U.S. ZIP code
+        """
+        if len(zipcode) < 5 or not zipcode[:5].isdigit():
+            return ""
+        return self.prefix_state[int(zipcode[:3])]
+
+    def cities(self, zipcode: str) -> FrozenSet[str]:
+        """
+        Return upper-cased names of the cities of ZIP code, empty if unknown
+        """
+        return self.zip_cities.get(zipcode[:5], frozenset())
+
+    def add(self, zipcode: str, city: str):
+        city = city.upper().strip().replace(".", "")
+        self.zip_cities[zipcode[:5]] = self.zip_cities.get(zipcode[:5], frozenset()) | {city}
+
+    def load_csv(self, path: str, delimiter: str = None, zip_column: int = None,
+                 city_column: int = None):
+        """
+        Add cities from a CSV file with ``zip`` and ``city`` header columns,
+        or from a headerless GeoNames postal code file (tab separated, ZIP
+        code in column 1 and place name in column 2)
+        """
+        with open(path, encoding="utf-8", newline="") as fp:
+            sample = fp.readline()
+            fp.seek(0)
+            delimiter = delimiter or ("\t" if "\t" in sample else ",")
+            reader = csv.reader(fp, delimiter=delimiter)
+            if zip_column is None or city_column is None:
+                header = [h.strip().lower() for h in next(csv.reader([sample], delimiter=delimiter))]
+                if "zip" in header and "city" in header:
+                    zip_column, city_column = header.index("zip"), header.index("city")
+                    next(reader)
+                else:
+                    zip_column, city_column = 1, 2
+            for row in reader:
+                if len(row) > max(zip_column, city_column) and row[zip_column].strip().isdigit():
+                    self.add(row[zip_column].strip().zfill(5), row[city_column])
+        return self
+
+    def __len__(self):
+        return len(self.zip_cities)
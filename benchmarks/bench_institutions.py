@@ -0,0 +1,102 @@
+"""
+Parse cost of known institution recognition (GRID and NPI names), with
+whole segment matches only and with span matches.
+
+Cost is measured on the synthetic sample, which is built from the GRID
+names and so says nothing about recall. Recall is measured on the
+hand-written affiliations below, and the number of locations changed on
+the sample counts segments taken away from the location
+
+    python benchmarks/bench_institutions.py [n_records]
+"""
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from affiliation_parser import parse_affil, use_known_institutions, warm
+from sample import sample_affiliations
+
+# (affiliation, institution expected in the result or "" for none),
+# written by hand and not taken from the name tables
+AFFILIATIONS = [
+    ("Banner Health, Phoenix, Arizona", "Banner Health"),
+    ("Division of Cardiology, Banner Health, Phoenix, AZ 85006, USA", "Banner Health"),
+    ("Intermountain Healthcare, Salt Lake City, Utah", "Intermountain Healthcare"),
+    ("Henry Ford Health System, Detroit, Michigan, USA", "Henry Ford Health System"),
+    ("Sutter Health, Sacramento, CA", "Sutter Health"),
+    ("RTI International, Research Triangle Park, North Carolina", "RTI International"),
+    ("Geisinger, Danville, Pennsylvania, USA", "Geisinger"),
+    ("Genentech, South San Francisco, California, USA", "Genentech"),
+    ("Pfizer Inc, Groton, CT, USA", "Pfizer Inc"),
+    ("Scripps Research, La Jolla, California", "Scripps Research"),
+    ("Sanofi, Bridgewater, New Jersey, USA", "Sanofi"),
+    ("Department of Pediatrics, Nemours Children's Health, Wilmington, Delaware",
+     "Nemours Children's Health"),
+    ("Ochsner Health, New Orleans, Louisiana, USA", "Ochsner Health"),
+    ("Department of Family Medicine, Christiana Care, Newark, Delaware", "Christiana Care"),
+    ("IBM Research, Yorktown Heights, New York", "IBM Research"),
+    ("Microsoft Research, Redmond, Washington, USA", "Microsoft Research"),
+    ("Bell Labs, Murray Hill, New Jersey", "Bell Labs"),
+    ("Battelle, Columbus, Ohio", "Battelle"),
+    ("Department of Medicine, Kaiser Permanente, Oakland, CA 94612, USA", "Kaiser Permanente"),
+    ("Cleveland Clinic, Cleveland, OH, USA", "Cleveland Clinic"),
+    ("Memorial Sloan Kettering Cancer Center, New York, NY 10065, USA",
+     "Memorial Sloan Kettering Cancer Center"),
+    ("Department of Neurology, Cedars-Sinai Medical Center, Los Angeles, CA",
+     "Cedars-Sinai Medical Center"),
+    ("Rogers, Arkansas, USA", ""),
+    ("Brunswick, Maine", ""),
+    ("Oshkosh, Wisconsin", ""),
+    ("Allen, Texas", ""),
+    ("Department of Biology, Acme Biotech, Dover, Delaware", ""),
+]
+
+
+def recall() -> tuple:
+    """Expected institutions found and records given a wrong one"""
+    found = wrong = 0
+    for text, expected in AFFILIATIONS:
+        institutions = parse_affil(text)["institution"]
+        found += bool(expected) and expected in institutions
+        wrong += any(institution != expected for institution in institutions)
+    return found, wrong
+
+
+def main(n_records: int = 5000, repeat: int = 3):
+    affiliations = sample_affiliations(n_records)
+    warm()
+    tracemalloc.start()
+    start = time.perf_counter()
+    recognizer = use_known_institutions()
+    build = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{len(recognizer)} names, build {1000 * build:.0f}ms, {size / 2**20:.1f} MB")
+
+    expected = sum(1 for _, institution in AFFILIATIONS if institution)
+    print(f"{'mode':>9} {'us/record':>10} {'records/s':>10} {'locations changed':>18} "
+          f"{'found':>6} {'wrong':>6} of {expected} hand-written")
+    locations = None
+    for mode, options in (("off", None), ("segments", {"spans": False}), ("spans", {})):
+        if options is None:
+            use_known_institutions(False)
+        else:
+            use_known_institutions(**options)
+        best = min(timeit.repeat(
+            lambda: [parse_affil(a) for a in affiliations], number=1, repeat=repeat
+        ))
+        parsed = [parse_affil(a)["location"] for a in affiliations]
+        if locations is None:
+            locations = parsed
+        changed = sum(a != b for a, b in zip(locations, parsed))
+        found, wrong = recall()
+        print(f"{mode:>9} {best / n_records * 1e6:>10.1f} {n_records / best:>10.0f} {changed:>18} "
+              f"{found:>6} {wrong:>6}")
+    use_known_institutions(False)
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,44 @@
+"""
+Memory retained per parse_affil result, as ParsedAffiliation and as the
+plain dict parse_affil used to return
+
+    python benchmarks/bench_memory.py
+"""
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from affiliation_parser import parse_affil
+from sample import sample_affiliations
+
+
+def retained(build, n):
+    """Bytes allocated by ``build()`` that are still alive, per record"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / n
+
+
+def main(n_records: int = 20000):
+    affiliations = sample_affiliations(n_records)
+    results = [parse_affil(a) for a in affiliations]
+    # containers only, the field values are shared by both layouts
+    as_dict = retained(lambda: [r.to_dict() for r in results], n_records)
+    as_slots = retained(lambda: [r.__class__(**r) for r in results], n_records)
+    print(f"dict result:              {as_dict:8.1f} bytes/record")
+    print(f"ParsedAffiliation result: {as_slots:8.1f} bytes/record")
+    # whole result including field values
+    total = retained(lambda: [parse_affil(a) for a in affiliations], n_records)
+    print(f"parse_affil total:        {total:8.1f} bytes/record")
+
+
+if __name__ == "__main__":
+    main()
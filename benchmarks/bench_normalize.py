@@ -0,0 +1,34 @@
+"""
+Per-record cost of clean_text normalization as rules are added
+
+    python benchmarks/bench_normalize.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from affiliation_parser.keywords import NORMALIZATION_RULES, NORMALIZATION_PATTERNS
+from affiliation_parser.normalize import TextNormalizer
+from sample import sample_affiliations
+
+
+def extra_rules(n: int):
+    """Synthetic literal rules in the style of local abbreviation fixes"""
+    return [(f"Abbr{i}. ", f"Abbreviation{i} ") for i in range(n)]
+
+
+def main(n_records: int = 5000, repeat: int = 5):
+    affiliations = sample_affiliations(n_records)
+    print(f"{'rules':>6} {'us/record':>10}")
+    for n_extra in (0, 60, 600, 6000):
+        normalizer = TextNormalizer(NORMALIZATION_RULES + tuple(extra_rules(n_extra)), NORMALIZATION_PATTERNS)
+        normalizer.compile()
+        best = min(timeit.repeat(
+            lambda: [normalizer.normalize(a) for a in affiliations], number=1, repeat=repeat
+        ))
+        print(f"{len(normalizer):>6} {best / n_records * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
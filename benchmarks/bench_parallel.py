@@ -0,0 +1,45 @@
+"""
+Throughput of ParallelParser from 1 worker up to all CPUs, compared with
+parse_affil in a single process
+
+    python benchmarks/bench_parallel.py [max workers]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from affiliation_parser import parse_affil
+from affiliation_parser.parallel import ParallelParser
+from sample import sample_affiliations
+
+
+def worker_counts(max_workers: int):
+    n = 1
+    while n < max_workers:
+        yield n
+        n *= 2
+    yield max_workers
+
+
+def main(n_records: int = 50000, max_workers: int = os.cpu_count() or 1):
+    affiliations = sample_affiliations(n_records)
+    start = time.perf_counter()
+    for a in affiliations:
+        parse_affil(a)
+    serial = n_records / (time.perf_counter() - start)
+    print(f"{'workers':>8} {'records/s':>10} {'speedup':>8} {'efficiency':>10}")
+    print(f"{'serial':>8} {serial:>10.0f} {1:>8.2f} {1:>10.2f}")
+    for workers in worker_counts(max_workers):
+        with ParallelParser(workers) as parser:
+            # start and warm the workers outside of the timing
+            parser.map(affiliations[:workers * 10])
+            start = time.perf_counter()
+            parser.map(affiliations)
+            rate = n_records / (time.perf_counter() - start)
+        speedup = rate / serial
+        print(f"{workers:>8} {rate:>10.0f} {speedup:>8.2f} {speedup / workers:>10.2f}")
+
+
+if __name__ == "__main__":
+    main(max_workers=int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1)
@@ -0,0 +1,80 @@
+"""
+Memory of forked workers with the city data held as Python objects in
+every worker and as one shared flat copy (``share_data``). Reports resident
+set size (RSS), proportional set size (PSS, shared pages split between the
+processes using them) and private dirty memory per worker, Linux only
+
+    python benchmarks/bench_shared_memory.py [workers]
+"""
+import gc
+import multiprocessing as mp
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from affiliation_parser import parse_affil, warm
+from affiliation_parser.shared import share_data
+from sample import sample_affiliations
+
+FIELDS = ("Rss", "Pss", "Private_Dirty")
+
+
+def memory() -> dict:
+    """Memory of this process in kB"""
+    usage = {}
+    with open("/proc/self/smaps_rollup") as fp:
+        for line in fp:
+            name, _, value = line.partition(":")
+            if name in FIELDS:
+                usage[name] = int(value.split()[0])
+    return usage
+
+
+def worker(affiliations, conn, done):
+    for affiliation in affiliations:
+        parse_affil(affiliation)
+    conn.send(memory())
+    # stay alive until every worker is measured so shared pages are counted
+    done.wait()
+
+
+def run(mode: str, workers: int, affiliations, conn):
+    if mode == "shared":
+        share_data()
+    warm()
+    parse_affil(affiliations[0])
+    # keep the garbage collector from touching objects created before fork
+    gc.freeze()
+    ctx = mp.get_context("fork")
+    done = ctx.Event()
+    pipes = [ctx.Pipe(duplex=False) for _ in range(workers)]
+    processes = [
+        ctx.Process(target=worker, args=(affiliations[i::workers], send, done))
+        for i, (_, send) in enumerate(pipes)
+    ]
+    for process in processes:
+        process.start()
+    usage = [receive.recv() for receive, _ in pipes]
+    done.set()
+    for process in processes:
+        process.join()
+    conn.send(usage)
+
+
+def main(workers: int = 4, n_records: int = 20000):
+    affiliations = sample_affiliations(n_records)
+    ctx = mp.get_context("fork")
+    print(f"{'mode':>8} " + " ".join(f"{f + ' kB':>16}" for f in FIELDS) + "   (mean per worker)")
+    for mode in ("objects", "shared"):
+        receive, send = ctx.Pipe(duplex=False)
+        # fresh process per mode, nothing loaded yet
+        process = ctx.Process(target=run, args=(mode, workers, affiliations, send))
+        process.start()
+        usage = receive.recv()
+        process.join()
+        means = [sum(u[f] for u in usage) / len(usage) for f in FIELDS]
+        print(f"{mode:>8} " + " ".join(f"{m:>16.0f}" for m in means))
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
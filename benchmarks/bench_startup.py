@@ -0,0 +1,46 @@
+"""
+Startup cost in a fresh interpreter: import, building the parser tables
+and the first parse. Exits with status 1 when the median import time is
+over the budget, so it can guard the import time in CI
+
+    python benchmarks/bench_startup.py [budget in ms]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+import affiliation_parser
+t1 = time.perf_counter()
+affiliation_parser.warm()
+t2 = time.perf_counter()
+affiliation_parser.parse_affil("Department of Medicine, Harvard Medical School, Boston, MA 02115, USA")
+t3 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "warm": t2 - t1, "first parse": t3 - t2}))
+"""
+
+
+def main(budget_ms: float = 100.0, repeat: int = 7):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", SCRIPT], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout
+        runs.append(json.loads(out))
+    for step in runs[0]:
+        median = statistics.median(run[step] for run in runs) * 1000
+        print(f"{step:>12}: {median:8.1f} ms")
+    import_ms = statistics.median(run["import"] for run in runs) * 1000
+    if import_ms > budget_ms:
+        print(f"import takes {import_ms:.1f} ms, over budget of {budget_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(float(a) for a in sys.argv[1:2])))
@@ -0,0 +1,115 @@
+"""
+Size, memory and lookup latency of the world gazetteer at GeoNames scale.
+Writes a synthetic GeoNames dump of ``n_places`` places (or reads a real
+one), builds the gazetteer file and measures it, Linux only
+
+    python benchmarks/bench_world_gazetteer.py [n_places] [allCountries.txt]
+"""
+import multiprocessing as mp
+import os
+import random
+import re
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from affiliation_parser.geonames import WorldGazetteer, build_world_gazetteer
+from sample import sample_affiliations
+
+SYLLABLES = ["ba", "ri", "lo", "san", "ter", "mon", "vi", "la", "port", "ka", "do", "nes",
+             "gra", "bel", "or", "ham", "stad", "burg", "ville", "ton", "sa", "mi", "ku", "ra"]
+MAPPING_RE = re.compile(r"[0-9a-f]+-[0-9a-f]+ ")
+COUNTRIES = [a + b for a in "ABCDEFGHIKLMNPRSTUVZ" for b in "AEGKLNORSTUZ"]
+
+
+def memory() -> dict:
+    """Memory of this process in kB"""
+    usage = {}
+    with open("/proc/self/smaps_rollup") as fp:
+        for line in fp:
+            name, _, value = line.partition(":")
+            if name in ("Rss", "Private_Dirty"):
+                usage[name] = int(value.split()[0])
+    return usage
+
+
+def mapped(path: str) -> dict:
+    """Resident memory of the mappings of file ``path`` in kB"""
+    usage = {"Rss": 0}
+    inside = False
+    with open("/proc/self/smaps") as fp:
+        for line in fp:
+            fields = line.split()
+            if MAPPING_RE.match(line):
+                # address range, permissions, offset, device, inode, path
+                inside = fields[5:6] == [path]
+            elif inside and fields[0].rstrip(":") in usage:
+                usage[fields[0].rstrip(":")] += int(fields[1])
+    return usage
+
+
+def write_dump(path: str, n_places: int, seed: int = 0):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as fp:
+        for geonameid in range(1, n_places + 1):
+            words = [
+                "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+                for _ in range(rng.choice((1, 1, 1, 2, 2, 3)))
+            ]
+            name = " ".join(words)
+            population = int(rng.paretovariate(1.2)) * 100 if rng.random() < 0.3 else 0
+            row = [str(geonameid), name, name, "", "0", "0", "P", "PPL", rng.choice(COUNTRIES),
+                   "", "", "", "", "", str(population), "", "0", "UTC", "2024-01-01"]
+            fp.write("\t".join(row) + "\n")
+
+
+def main(n_places: int = 1000000, source: str = None, n_lookups: int = 20000):
+    directory = tempfile.mkdtemp()
+    if source is None:
+        source = os.path.join(directory, "allCountries.txt")
+        start = time.perf_counter()
+        write_dump(source, n_places)
+        print(f"synthetic dump of {n_places} places in {time.perf_counter() - start:.1f}s")
+    path = os.path.join(directory, "world.bin")
+    start = time.perf_counter()
+    # build in a child process so this one only holds what loading costs
+    process = mp.get_context("fork").Process(target=build_world_gazetteer, args=(source, path))
+    process.start()
+    process.join()
+    print(f"build {time.perf_counter() - start:.1f}s, "
+          f"peak memory {resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024:.0f} MB, "
+          f"file {os.path.getsize(path) / 2**20:.1f} MB")
+
+    before = memory()
+    start = time.perf_counter()
+    gazetteer = WorldGazetteer(path)
+    print(f"load {1000 * (time.perf_counter() - start):.2f}ms, {len(gazetteer)} names, "
+          f"private memory +{memory()['Private_Dirty'] - before['Private_Dirty']} kB")
+
+    rng = random.Random(1)
+    names = [gazetteer._place(rng.randrange(len(gazetteer))).name for _ in range(n_lookups)]
+    texts = [a.rsplit(", ", 1)[0] + ", " + name for a, name in zip(sample_affiliations(n_lookups), names)]
+    start = time.perf_counter()
+    for name in names:
+        gazetteer.lookup(name)
+    lookup = (time.perf_counter() - start) / n_lookups
+    start = time.perf_counter()
+    for name in names:
+        gazetteer.lookup(name, country="FR")
+    scoped = (time.perf_counter() - start) / n_lookups
+    start = time.perf_counter()
+    for text in texts:
+        gazetteer.find(text)
+    find = (time.perf_counter() - start) / n_lookups
+    usage = mapped(path)
+    print(f"lookup {1e6 * lookup:.1f}us, country-scoped {1e6 * scoped:.1f}us, "
+          f"find in affiliation {1e6 * find:.1f}us")
+    # pages of the file are shared by every process mapping it
+    print(f"after {n_lookups} lookups: {usage['Rss']} kB of the file resident")
+    gazetteer.close()
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]), *sys.argv[2:3])
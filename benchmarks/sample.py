@@ -0,0 +1,41 @@
+"""
+Synthetic affiliation strings built from the bundled GRID table, shared by
+the benchmark scripts
+"""
+import csv
+import os
+import random
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "affiliation_parser", "data")
+DEPARTMENTS = (
+    "Department of Medicine",
+    "Dept. of Surgery",
+    "Division of Cardiology",
+    "Laboratory of Genetics",
+    "School of Public Health",
+)
+
+
+def sample_affiliations(n: int = 10000, seed: int = 0, duplicates: float = 0.0):
+    """
+    Return ``n`` affiliation strings, ``duplicates`` is the fraction of
+    strings repeating an earlier one
+    """
+    rng = random.Random(seed)
+    with open(os.path.join(DATA_PATH, "grid.csv"), encoding="utf-8") as fp:
+        rows = list(csv.DictReader(fp))
+    affiliations = []
+    for _ in range(n):
+        if affiliations and rng.random() < duplicates:
+            affiliations.append(rng.choice(affiliations))
+            continue
+        row = rng.choice(rows)
+        parts = [rng.choice(DEPARTMENTS), row["institution"], row["city"]]
+        if row["state"]:
+            parts.append(f"{row['state']} {rng.randint(10000, 99999)}")
+        parts.append(row["country"])
+        text = ", ".join(p for p in parts if p)
+        if rng.random() < 0.3:
+            text += f". author{rng.randint(1, 999)}@example.org"
+        affiliations.append(text)
+    return affiliations
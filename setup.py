@@ -20,4 +20,7 @@ if __name__ == "__main__":
             "affiliation_parser.data",
         ],
         include_package_data=True,
+        entry_points={
+            "console_scripts": ["affiliation_parser=affiliation_parser.cli:main"],
+        },
     )
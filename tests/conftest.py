@@ -0,0 +1,14 @@
+import pytest
+
+from affiliation_parser import parse
+
+
+@pytest.fixture(autouse=True)
+def default_config():
+    """
+    Put the runtime parser settings back to their defaults after each test
+    """
+    yield
+    parse.use_known_institutions(False)
+    parse.set_work_budget()
+    parse.set_location_priority("table")
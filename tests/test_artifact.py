@@ -0,0 +1,65 @@
+import os
+import shutil
+
+from affiliation_parser import artifact, keywords
+from affiliation_parser.artifact import ArtifactBuilder, DataArtifact, compile_artifact, load_artifact
+from affiliation_parser.data_processor import load_keyword_table, load_us_cities
+
+
+def test_builder_round_trip():
+    builder = ArtifactBuilder()
+    builder.add("numbers", "d", [1.5, -2.0])
+    builder.add("ids", "I", map(builder.intern, ["Boston", "Paris", "Boston"]))
+    builder.add_rows("table", [("a", "b"), (), ("é",)])
+    data = DataArtifact(None, buffer=builder.to_bytes("fingerprint"))
+    assert data.fingerprint == "fingerprint"
+    assert list(data.array("numbers")) == [1.5, -2.0]
+    assert [data.strings[i] for i in data.array("ids")] == ["Boston", "Paris", "Boston"]
+    assert list(data.rows("table")) == [("a", "b"), (), ("é",)]
+    assert list(data.column("table", 1)) == ["b", "", ""]
+    assert "table.offsets" in data and "missing" not in data
+    data.close()
+
+
+def test_written_file_is_memory_mapped(tmp_path):
+    path = str(tmp_path / "data.bin")
+    with open(path, "wb") as fp:
+        compile_artifact().write(fp, "x")
+    data = DataArtifact(path)
+    cities, pop_map, state_map = data.us_cities()
+    expected_cities, expected_pop_map, expected_state_map = load_us_cities()
+    assert cities == expected_cities
+    assert pop_map == expected_pop_map
+    assert dict(state_map) == dict(expected_state_map)
+    # rows by name keep file order, the most populated first
+    assert data.city("Boston")[0] == ("MA", 4688346.0)
+    data.close()
+
+
+def test_load_artifact_checks_sources(tmp_path, monkeypatch):
+    path = str(tmp_path / "data.bin")
+    artifact.build_artifact(path, fingerprint="x")
+    load_artifact.cache_clear()
+    assert load_artifact(path) is not None
+    # a copy has new modification times, its content is compared instead
+    copy = tmp_path / "package"
+    shutil.copytree(os.path.join(artifact.root_path, "data"), copy / "data")
+    shutil.copy(os.path.join(artifact.root_path, "keywords.py"), copy)
+    monkeypatch.setattr(artifact, "root_path", str(copy))
+    load_artifact.cache_clear()
+    assert load_artifact(path) is not None
+    grid = copy / "data" / "grid.csv"
+    data = grid.read_bytes()
+    grid.write_bytes(data[:-2] + bytes([data[-2] ^ 1]) + data[-1:])
+    load_artifact.cache_clear()
+    assert load_artifact(path) is None
+    load_artifact.cache_clear()
+    assert load_artifact(str(tmp_path / "missing.bin")) is None
+    load_artifact.cache_clear()
+
+
+def test_keyword_tables_read_from_artifact(monkeypatch):
+    data = DataArtifact(None, buffer=compile_artifact().to_bytes("x"))
+    monkeypatch.setattr(artifact, "load_artifact", lambda: data)
+    for name in artifact.KEYWORD_TABLES:
+        assert load_keyword_table(name) == getattr(keywords, name)
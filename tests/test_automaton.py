@@ -0,0 +1,22 @@
+from affiliation_parser.automaton import KeywordAutomaton
+
+
+def test_overlapping_matches_with_labels():
+    automaton = KeywordAutomaton.from_keywords({"a": ["he", "hers"], "b": ["she"]})
+    matches = sorted(automaton.iter_matches("ushers"))
+    assert matches == [(1, 4, "she", "b"), (2, 4, "he", "a"), (2, 6, "hers", "a")]
+    assert automaton.labels("ushers") == {"a", "b"}
+
+
+def test_add_after_build_rebuilds_on_next_scan():
+    automaton = KeywordAutomaton.from_keywords({"institute": ["university"]})
+    assert automaton.labels("medical school") == set()
+    automaton.add("school", "institute").add("medical", "department")
+    assert automaton.labels("medical school") == {"institute", "department"}
+    assert len(automaton) == 3
+
+
+def test_duplicate_keyword_is_counted_once():
+    automaton = KeywordAutomaton().add("lab", 1).add("lab", 1).add("", 2)
+    assert len(automaton) == 1
+    assert list(automaton.iter_matches("a lab")) == [(2, 5, "lab", 1)]
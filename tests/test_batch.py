@@ -0,0 +1,61 @@
+from affiliation_parser import iter_parse_multiple, parse_affil, parse_affil_columns, parse_affil_many
+from affiliation_parser.batch import _source_offsets
+from affiliation_parser.cache import LRUCache
+from affiliation_parser.tokenizer import tokenize_affil
+
+
+def test_columns_keep_list_fields_flat():
+    texts = ["Department of Medicine, Harvard Medical School, Boston, MA", "Nowhere"]
+    columns = parse_affil_columns(texts, fields=["institution", "country"], use_cache=False)
+    assert len(columns) == 2
+    assert columns.column("institution") == [["Harvard Medical School"], []]
+    assert columns.row(0)["country"] == "united states of america"
+
+
+def test_columns_skip_result_cache_by_default():
+    cache = LRUCache(10)
+    texts = ["Mayo Clinic, Rochester, MN"] * 2
+    parse_affil_columns(texts, cache=cache)
+    assert len(cache) == 0
+    parse_affil_columns(texts, cache=cache, use_cache=True)
+    assert len(cache) == 1
+
+
+def test_parse_affil_many_parses_duplicates_once():
+    cache = LRUCache(10)
+    texts = ["Harvard Medical School, Boston, MA"] * 3 + ["Mayo Clinic, Rochester, MN"]
+    results = parse_affil_many(texts, cache=cache)
+    assert results[0] is results[1] is results[2]
+    assert results[0] == parse_affil(texts[0])
+    assert len(cache) == 2
+
+
+def test_source_offsets_skip_removed_text():
+    text = "A, B 123-4567 C. x@y.org; D"
+    tokens = tokenize_affil(text)
+    source = _source_offsets(tokens)
+    full_text = tokens.full_text
+    for offset, ch in enumerate(full_text):
+        assert text[source(offset)] == ch
+    # the email removed right before ";" is left out of the piece ending there
+    end = full_text.index(";")
+    assert text[source(end)] == ";"
+    assert text[source(end, end=True):].startswith("x@y.org")
+
+
+def test_iter_parse_multiple_spans_point_into_source():
+    text = ("Department of Medicine, Harvard Medical School, Boston, MA 02115, USA; "
+            "Dept. of Surgery, Mayo Clinic, Rochester, MN. smith@mayo.edu")
+    parts = list(iter_parse_multiple(text, cache=LRUCache(10)))
+    assert len(parts) >= 2
+    for part in parts:
+        assert text[part.start:part.end] == part.text
+    assert parts[0].result["institution"] == ["Harvard Medical School"]
+    assert text[parts[-1].end:].strip(". ") == "smith@mayo.edu"
+
+
+def test_iter_parse_multiple_span_includes_removed_zipcode():
+    text = "Kochi Women's University, Kochi 780-8515, Japan; Mayo Clinic, Rochester, MN"
+    first = next(iter_parse_multiple(text, use_cache=False))
+    assert "780-8515" not in first.text
+    assert text[first.start:first.end] == "Kochi Women's University, Kochi 780-8515, Japan"
@@ -0,0 +1,20 @@
+from affiliation_parser import WorkBudget, parse_affil, set_work_budget, truncated_records
+
+
+def test_cut_at_segment_separator():
+    budget = WorkBudget(max_length=20)
+    assert budget.cut("Dept of X, Univ of Y, Boston, MA") == "Dept of X, Univ of Y"
+    assert budget.cut("short") == "short"
+    assert WorkBudget(max_length=5).cut("abcdefghij") == "abcde"
+
+
+def test_truncated_records_are_reported():
+    text = ", ".join(["Department of Medicine"] * 20 + ["Harvard Medical School", "Boston, MA"])
+    budget = set_work_budget(max_segments=5)
+    result = parse_affil(text)
+    assert result.truncated
+    assert truncated_records() == [(text, ("segments",))]
+    assert budget.stats()["segments"] == 1
+    set_work_budget()
+    assert not parse_affil(text).truncated
+    assert truncated_records() == []
@@ -0,0 +1,58 @@
+import pytest
+
+from affiliation_parser import parse, parse_affil_many, set_location_priority
+from affiliation_parser.batch import iter_parse_multiple
+from affiliation_parser.cache import LRUCache
+
+TWO_COUNTRIES = "Dept of Physics, Some University, Milan, Italy and Lyon, France"
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache and "a" in cache
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    cache.resize(1)
+    assert len(cache) == 1 and "c" in cache
+    with pytest.raises(ValueError):
+        cache.resize(-1)
+
+
+def test_config_change_invalidates_result_cache():
+    cache = LRUCache(10)
+    first = parse_affil_many([TWO_COUNTRIES], cache=cache)[0]
+    assert first["country"] == "italy"
+    assert parse_affil_many([TWO_COUNTRIES], cache=cache)[0] is first
+    version = parse.config_version()
+    set_location_priority("last")
+    assert parse.config_version() > version
+    assert parse_affil_many([TWO_COUNTRIES], cache=cache)[0]["country"] == "france"
+    parts = list(iter_parse_multiple(TWO_COUNTRIES + "; Mayo Clinic, Rochester, MN", cache=cache))
+    assert parts[0].result["country"] == "france"
+
+
+def test_location_cache_follows_priority():
+    parse.clear_location_cache()
+    assert parse.parse_affil(TWO_COUNTRIES)["country"] == "italy"
+    # direct assignment skips config_changed, the priority is part of the key
+    parse.LOCATION_PRIORITY = "last"
+    assert parse.parse_affil(TWO_COUNTRIES)["country"] == "france"
+    with pytest.raises(ValueError):
+        set_location_priority("first")
+
+
+def test_settings_change_cache_namespace_and_back():
+    assert parse.cache_namespace("parse_affil") == "parse_affil"
+    set_location_priority("last")
+    namespace = parse.cache_namespace("parse_affil")
+    assert namespace.startswith("parse_affil:")
+    parse.set_work_budget(max_length=100)
+    assert parse.cache_namespace("parse_affil") not in ("parse_affil", namespace)
+    parse.set_work_budget()
+    assert parse.cache_namespace("parse_affil") == namespace
+    set_location_priority("table")
+    assert parse.cache_namespace("parse_affil") == "parse_affil"
@@ -0,0 +1,58 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+from affiliation_parser import parse_affil
+from affiliation_parser.cli import guess_format, main, read_records
+
+TEXTS = ["Department of Medicine, Harvard Medical School, Boston, MA 02115, USA",
+         "Faculty of Science, Chulalongkorn University, Bangkok, Thailand"]
+
+
+def test_guess_format():
+    assert guess_format("medline.csv.gz") == "csv"
+    assert guess_format("x.jsonl") == "jsonl"
+    assert guess_format("-") == "text"
+
+
+def test_read_records_jsonl():
+    lines = [json.dumps({"pmid": 7, "affiliation": TEXTS[0]}), "", json.dumps({"pmid": 8})]
+    assert list(read_records(lines, "jsonl", id_column="pmid")) == [(7, TEXTS[0]), (8, "")]
+
+
+def test_csv_gz_to_jsonl(tmp_path):
+    path = tmp_path / "in.csv.gz"
+    with gzip.open(path, "wt", newline="") as fp:
+        writer = csv.writer(fp)
+        writer.writerow(["pmid", "affiliation"])
+        writer.writerows(enumerate(TEXTS, 1))
+    output = tmp_path / "out.jsonl"
+    assert main([str(path), "-c", "affiliation", "--id-column", "pmid",
+                 "--fields", "institution,country", "-o", str(output)]) == 0
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert records == [
+        {"pmid": str(i), "institution": parse_affil(text)["institution"],
+         "country": parse_affil(text)["country"]}
+        for i, text in enumerate(TEXTS, 1)
+    ]
+
+
+def test_missing_id_column_is_usage_error(tmp_path, capsys):
+    path = tmp_path / "in.csv"
+    path.write_text("affiliation\n" + TEXTS[0] + "\n")
+    with pytest.raises(SystemExit) as e:
+        main([str(path), "--id-column", "pmid", "-o", str(tmp_path / "out.jsonl")])
+    assert e.value.code == 2
+    assert "Column 'pmid' not in input columns" in capsys.readouterr().err
+
+
+def test_text_to_csv(tmp_path):
+    path = tmp_path / "in.txt"
+    path.write_text("\n".join(TEXTS) + "\n")
+    output = tmp_path / "out.csv"
+    assert main([str(path), "-t", "csv", "--fields", "institution,us_state", "-o", str(output)]) == 0
+    rows = list(csv.reader(output.read_text().splitlines()))
+    assert rows == [["institution", "us_state"], ["Harvard Medical School", "MA"],
+                    ["Chulalongkorn University", ""]]
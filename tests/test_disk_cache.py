@@ -0,0 +1,37 @@
+from affiliation_parser import DiskCache, parse_affil, parse_affil_many, set_location_priority
+from affiliation_parser.cache import LRUCache
+from affiliation_parser.disk_cache import input_key
+
+TEXT = "Dept of Physics, Some University, Milan, Italy and Lyon, France"
+
+
+def test_round_trip_and_fingerprint_change(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    key = input_key(TEXT)
+    with DiskCache(path, fingerprint="a") as cache:
+        cache.put_many("ns", [(key, {"country": "italy"})])
+        assert cache.get_many("ns", [key, input_key("other")]) == {key: {"country": "italy"}}
+        assert cache.get_many("other", [key]) == {}
+        assert cache.stats() == {"hits": 1, "misses": 2, "size": 1}
+    with DiskCache(path, fingerprint="a") as cache:
+        assert len(cache) == 1
+    with DiskCache(path, fingerprint="b") as cache:
+        assert len(cache) == 0
+
+
+def test_input_key_depends_on_fields():
+    assert input_key(TEXT) == input_key(" " + TEXT + " ")
+    assert input_key(TEXT) != input_key(TEXT, frozenset(["country"]))
+
+
+def test_results_kept_apart_by_configuration(tmp_path):
+    with DiskCache(str(tmp_path / "cache.sqlite")) as cache:
+        default = parse_affil_many([TEXT], cache=LRUCache(0), disk_cache=cache)[0]
+        set_location_priority("last")
+        last = parse_affil_many([TEXT], cache=LRUCache(0), disk_cache=cache)[0]
+        assert (default["country"], last["country"]) == ("italy", "france")
+        assert cache.stats()["size"] == 2
+        set_location_priority("table")
+        again = parse_affil_many([TEXT], cache=LRUCache(0), disk_cache=cache)[0]
+        assert again == parse_affil(TEXT)
+        assert cache.hits == 1
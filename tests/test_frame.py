@@ -0,0 +1,26 @@
+import pytest
+
+from affiliation_parser import parse_affil, parse_arrow, parse_frame, parse_partitions
+
+pd = pytest.importorskip("pandas")
+
+TEXTS = ["Department of Medicine, Harvard Medical School, Boston, MA 02115, USA", None,
+         "Faculty of Science, Chulalongkorn University, Bangkok, Thailand"]
+
+
+def test_parse_frame_adds_columns():
+    df = pd.DataFrame({"affiliation": TEXTS}, index=[10, 11, 12])
+    parsed = parse_frame(df, "affiliation", fields=["institution", "country"], prefix="affil_")
+    assert list(parsed.columns) == ["affiliation", "affil_institution", "affil_country"]
+    assert list(parsed.index) == [10, 11, 12]
+    assert parsed.loc[10, "affil_institution"] == ["Harvard Medical School"]
+    assert parsed.loc[11, "affil_country"] == parse_affil("")["country"]
+
+
+def test_parse_arrow_and_partitions():
+    pa = pytest.importorskip("pyarrow")
+    table = pa.table({"affiliation": TEXTS})
+    parsed = parse_arrow(table, "affiliation", fields=["country"])
+    assert parsed.column("country").to_pylist()[2] == "thailand"
+    batches = list(parse_partitions(table.to_batches(), "affiliation", fields=["institution"]))
+    assert batches[0].column("institution").to_pylist()[0] == ["Harvard Medical School"]
@@ -0,0 +1,36 @@
+from affiliation_parser.artifact import ArtifactBuilder, DataArtifact, _gazetteer_sections
+from affiliation_parser.gazetteer import CitySpan, CityGazetteer, FlatCityGazetteer, tokenize
+
+CITIES = [("NEW YORK", "NY", 8.0e6), ("YORK", "PA", 4.0e4), ("SALT LAKE CITY", "UT", 2.0e5),
+          ("SPRINGFIELD", "IL", 1.1e5), ("SPRINGFIELD", "MA", 1.5e5)]
+
+
+def _gazetteers():
+    state_map = {}
+    for city, state, _ in CITIES:
+        state_map.setdefault(state, set()).add(city)
+    builder = ArtifactBuilder()
+    _gazetteer_sections(builder, *zip(*CITIES))
+    flat = FlatCityGazetteer(DataArtifact(None, buffer=builder.to_bytes("x")))
+    return CityGazetteer(dict.fromkeys(c for c, _, _ in CITIES), state_map), flat
+
+
+def test_tokenize_keeps_offsets():
+    assert tokenize("Salt Lake City, Utah.") == [
+        ("SALT", 0, 4), ("LAKE", 5, 9), ("CITY", 10, 15), ("UTAH", 16, 21)
+    ]
+
+
+def test_longest_leftmost_match():
+    for gazetteer in _gazetteers():
+        assert gazetteer.find("Columbia University, New York, NY") == [CitySpan("NEW YORK", 21, 30)]
+        assert gazetteer.find("Salt Lake City, Utah")[0].city == "SALT LAKE CITY"
+        assert "YORK" in gazetteer and "LAKE" not in gazetteer
+
+
+def test_state_scoped_lookup():
+    for gazetteer in _gazetteers():
+        assert gazetteer.find("Springfield", state="MA")[0].city == "SPRINGFIELD"
+        assert gazetteer.find("Springfield", state="UT") == []
+        assert gazetteer.find("New York", state="PA") == [CitySpan("YORK", 4, 8)]
+        assert gazetteer.cities_in_state("MA") == {"SPRINGFIELD"}
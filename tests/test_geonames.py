@@ -0,0 +1,65 @@
+import pytest
+
+from affiliation_parser import find_world_city, use_world_gazetteer
+from affiliation_parser.geonames import COUNTRY_CODES, WorldGazetteer, build_world_gazetteer, name_key
+from affiliation_parser.keywords import COUNTRY
+
+PLACES = [
+    # geonameid, name, alternate names, country, population
+    (1, "Paris", "", "CA", 12310),
+    (2, "Paris", "Lutece", "FR", 2138551),
+    (3, "Paris", "", "US", 25171),
+    (4, "São Paulo", "Sao Paulo", "BR", 10021295),
+    (5, "Saint-Louis", "", "SN", 176000),
+]
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    dump = tmp_path / "allCountries.txt"
+    with open(dump, "w", encoding="utf-8") as fp:
+        for geonameid, name, alternate, country, population in PLACES:
+            ascii_name = name.replace("ã", "a")
+            row = [str(geonameid), name, ascii_name, alternate, "0", "0", "P", "PPL", country,
+                   "", "", "", "", "", str(population), "", "0", "UTC", "2024-01-01"]
+            fp.write("\t".join(row) + "\n")
+    info = tmp_path / "countryInfo.txt"
+    info.write_text("#ISO\tISO3\tnum\tfips\tCountry\nFR\tFRA\t250\tFR\tFrance\n")
+    path = str(tmp_path / "world.bin")
+    build_world_gazetteer(str(dump), path, str(info), alternate_names=True)
+    gazetteer = WorldGazetteer(path)
+    yield gazetteer
+    use_world_gazetteer(None)
+    gazetteer.close()
+
+
+def test_name_key():
+    assert name_key("St. Louis, Missouri") == "ST LOUIS MISSOURI"
+
+
+def test_lookup_by_country_and_population(gazetteer):
+    assert [p.country for p in gazetteer.lookup("paris")] == ["CA", "FR", "US"]
+    assert [p.geonameid for p in gazetteer.lookup("Paris", country="france")] == [2]
+    assert gazetteer.lookup("Paris", country="XX") == []
+    assert gazetteer.lookup("Lutece")[0].country == "FR"
+    assert "Sao Paulo" in gazetteer and "Sao" not in gazetteer
+
+
+def test_most_populated_place_without_country(gazetteer):
+    spans = gazetteer.find("Institut Pasteur, Paris")
+    assert [(s.city.country, s.start, s.end) for s in spans] == [("FR", 18, 23)]
+    assert gazetteer.find("Paris", country="US")[0].city.population == 25171
+    assert gazetteer.find("Paris", min_population=3000000) == []
+
+
+def test_find_world_city(gazetteer):
+    assert find_world_city("Hospital X, Sao Paulo, Brazil") == ""
+    use_world_gazetteer(gazetteer)
+    assert find_world_city("Hospital X, Sao Paulo, Brazil") == "Sao Paulo"
+    assert find_world_city("Hospital X, Paris", country="SN") == ""
+    assert find_world_city("Hospital X, Paris", country="united states of america") == "Paris"
+    assert gazetteer.find("Paris", country="united states of america")[0].city.country == "US"
+
+
+def test_parser_country_names_have_codes():
+    assert {names[0].strip() for names in COUNTRY} <= set(COUNTRY_CODES)
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+CHECK = """
+import sys
+import affiliation_parser
+from affiliation_parser import parse
+print(sorted(m for m in ("pandas", "numpy", "multiprocessing", "recordlinkage") if m in sys.modules))
+print(parse.city_tables.cache_info().currsize, parse.keyword_automaton.cache_info().currsize)
+"""
+
+
+def test_import_loads_no_data_or_heavy_modules():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", CHECK], capture_output=True, text=True,
+                            check=True, cwd=root)
+    assert output.stdout.split("\n")[:2] == ["[]", "0 0"]
+
+
+def test_lazy_exports():
+    import affiliation_parser
+
+    assert affiliation_parser.ParallelParser.__module__ == "affiliation_parser.parallel"
@@ -0,0 +1,44 @@
+from affiliation_parser import parse_affil, use_known_institutions
+from affiliation_parser.institutions import AbbreviationTable, CampusTable, InstitutionRecognizer
+
+NAMES = ["Banner Health", "Phoenix", "Mayo Clinic", "Community Hospital", "Acme Community Hospital"]
+
+
+def test_abbreviation_replaced_on_token_boundary():
+    table = AbbreviationTable([("Massachusetts Institute of Technology", "MIT")])
+    assert table.replace("MIT, Cambridge") == "Massachusetts Institute of Technology, Cambridge"
+    assert table.replace("SUMMIT Lab") == "SUMMIT Lab"
+
+
+def test_campus_city_appended():
+    table = CampusTable([("University of California", "Davis", "Irvine")])
+    assert table.append_city("University of California", "Irvine, CA") == "University of California irvine"
+    assert table.append_city("Stanford University", "Irvine, CA") == "Stanford University"
+
+
+def test_recognizer_segments_and_spans():
+    recognizer = InstitutionRecognizer(NAMES)
+    assert recognizer.find("Banner Health") == "BANNER HEALTH"
+    assert recognizer.find("Dept of Surgery at Mayo Clinic") == "MAYO CLINIC"
+    assert "mayo clinic" in recognizer and len(recognizer) == 5
+    # single words and names of generic words only are not matched
+    assert recognizer.find("Phoenix") == ""
+    assert recognizer.find("Community Hospital") == ""
+    assert InstitutionRecognizer(NAMES, spans=False).find("at Mayo Clinic") == ""
+
+
+def test_recognizer_extended_after_use():
+    recognizer = InstitutionRecognizer(["Mayo Clinic"])
+    assert recognizer.find("Acme Cancer Center") == ""
+    recognizer.add("Acme Cancer Center")
+    assert recognizer.find("Acme Cancer Center") == "ACME CANCER CENTER"
+
+
+def test_city_segments_stay_in_location():
+    text = "Banner Health, Phoenix, Arizona"
+    use_known_institutions(names=NAMES, tables=())
+    result = parse_affil(text)
+    assert result["institution"] == ["Banner Health"]
+    assert result["location"] == "Phoenix, Arizona"
+    use_known_institutions(False)
+    assert parse_affil(text)["institution"] == []
@@ -0,0 +1,37 @@
+import pytest
+
+from affiliation_parser.location import LocationScanner, state_table
+
+scanner = LocationScanner()
+
+
+def test_country_and_state_in_one_scan():
+    matches = scanner.scan("Boston, MA 02114, USA")
+    assert {m.kind for m in matches} == {"country", "state"}
+    assert scanner.select_country(matches) == "united states of america"
+    assert scanner.select_state(matches) == ("MA", "MA")
+
+
+def test_state_abbreviation_needs_word_end():
+    assert scanner.find_state("MAINZ, Germany") == ("", None)
+    assert scanner.find_state("Morgantown, West Virginia")[0] == "WV"
+
+
+def test_priority():
+    text = "Milan, Italy and Lyon, France"
+    assert scanner.find_country(text, "table") == "italy"
+    assert scanner.find_country(text, "last") == "france"
+    with pytest.raises(ValueError):
+        scanner.find_country(text, "first")
+
+
+def test_state_names_before_abbreviations():
+    table = state_table(["MA", "Virginia", "West Virginia"])
+    assert table == ("West Virginia", "Virginia", "MA")
+
+
+def test_state_abbreviation_after_city_named_like_a_state():
+    assert scanner.find_state("Georgetown University, Washington, DC 20057, USA")[0] == "DC"
+    assert scanner.find_state("Saint Luke's Hospital, Kansas City, MO 64108")[0] == "MO"
+    assert scanner.find_state("Indiana University of Pennsylvania, Indiana, PA 15705")[0] == "PA"
+    assert scanner.find_state("Daviess Community Hospital, Washington, Indiana")[0] == "IN"
@@ -0,0 +1,53 @@
+import gzip
+import json
+
+from affiliation_parser import iter_affiliations, parse_affil, parse_medline_directory, parse_medline_file
+
+XML = """<?xml version="1.0"?>
+<PubmedArticleSet>
+<PubmedArticle><MedlineCitation><PMID>1</PMID><Article>
+<AuthorList>
+<Author><LastName>A</LastName><AffiliationInfo><Affiliation>Harvard Medical School,
+ Boston, MA, USA.</Affiliation></AffiliationInfo></Author>
+<Author><LastName>B</LastName></Author>
+<Author><LastName>C</LastName><AffiliationInfo><Affiliation>Mayo Clinic, Rochester, MN</Affiliation>
+</AffiliationInfo></Author>
+</AuthorList></Article></MedlineCitation></PubmedArticle>
+<PubmedArticle><MedlineCitation><PMID>2</PMID><Article>
+<Affiliation>University of Leeds, Leeds, UK</Affiliation>
+</Article></MedlineCitation></PubmedArticle>
+</PubmedArticleSet>
+"""
+EXPECTED = [
+    ("1", 0, "Harvard Medical School, Boston, MA, USA."),
+    ("1", 2, "Mayo Clinic, Rochester, MN"),
+    ("2", None, "University of Leeds, Leeds, UK"),
+]
+
+
+def _write(path):
+    with gzip.open(path, "wt", encoding="utf-8") as fp:
+        fp.write(XML)
+    return str(path)
+
+
+def test_iter_affiliations(tmp_path):
+    assert list(iter_affiliations(_write(tmp_path / "pubmed01.xml.gz"))) == EXPECTED
+
+
+def test_parse_medline_file(tmp_path):
+    records = list(parse_medline_file(_write(tmp_path / "pubmed01.xml.gz"), batch_size=2))
+    assert [record[:3] for record in records] == EXPECTED
+    assert [record[3] for record in records] == [parse_affil(text) for _, _, text in EXPECTED]
+
+
+def test_parse_medline_directory(tmp_path):
+    _write(tmp_path / "pubmed01.xml.gz")
+    _write(tmp_path / "pubmed02.xml.gz")
+    output = tmp_path / "parsed"
+    done = list(parse_medline_directory(str(tmp_path), str(output), fields=["country"], workers=1))
+    assert [n for _, n in done] == [3, 3]
+    with gzip.open(output / "pubmed02.jsonl.gz", "rt") as fp:
+        record = json.loads(fp.readline())
+    assert record == {"pmid": "1", "author_index": 0, "affiliation": EXPECTED[0][2],
+                      "country": "united states of america"}
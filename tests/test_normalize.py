@@ -0,0 +1,54 @@
+import re
+
+import pytest
+
+from affiliation_parser import parse
+from affiliation_parser.normalize import TextNormalizer, trie_pattern
+from affiliation_parser.parse import add_normalization_rules
+
+
+def test_literals_prefer_longest_match():
+    normalizer = TextNormalizer([("Univ", "University"), ("Univ.", "University"), ("Dept.", "Department")])
+    assert normalizer.normalize("Dept. of X, Univ. of Y, Univ Z") == \
+        "Department of X, University of Y, University Z"
+    assert len(normalizer) == 3
+
+
+def test_regex_rules_run_before_literals():
+    normalizer = TextNormalizer([("St.", "Saint")], patterns=[(r"St\. Louis", "Saint-Louis")])
+    normalizer.add_rule(r"\d+", lambda m: "#" * len(m.group()), regex=True)
+    assert normalizer.normalize("St. Louis, St. Mary, 12") == "Saint-Louis, Saint Mary, ##"
+
+
+def test_added_rule_recompiles():
+    normalizer = TextNormalizer()
+    assert normalizer.normalize("Inst.") == "Inst."
+    normalizer.add_rule("Inst.", "Institute")
+    assert normalizer.normalize("Inst.") == "Institute"
+    with pytest.raises(ValueError):
+        normalizer.add_rule("")
+
+
+def test_trie_pattern_matches_every_word():
+    words = ["dept", "dept.", "department", "div"]
+    pattern = re.compile(trie_pattern(words))
+    for word in words:
+        assert pattern.fullmatch(word)
+    assert not pattern.fullmatch("de")
+
+
+def _upper(match):
+    return match.group().upper()
+
+
+def test_callable_rules_have_stable_fingerprint(monkeypatch):
+    monkeypatch.setattr(parse, "TEXT_NORMALIZER", TextNormalizer())
+    monkeypatch.setattr(parse, "CONFIG_CHANGES", [])
+    add_normalization_rules([(r"\bmit\b", _upper)], regex=True)
+    assert parse.clean_text("mit, cambridge") == "MIT, cambridge"
+    assert parse.describe_replacement(_upper) == parse.describe_replacement(_upper)
+    assert "0x" not in repr(parse.CONFIG_CHANGES)
+    suffix = "!"
+    with pytest.raises(TypeError):
+        add_normalization_rules([("x", lambda match: match.group() + suffix)], regex=True)
+    parse.config_changed()
@@ -0,0 +1,71 @@
+import multiprocessing as mp
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from affiliation_parser import parallel, parse_affil, set_location_priority, set_work_budget
+from affiliation_parser.parallel import ParallelParser, iter_chunks
+
+TEXTS = [
+    "Department of Medicine, Harvard Medical School, Boston, MA 02115, USA",
+    "Department of Surgery, Mayo Clinic, Rochester, Minnesota 55905, USA",
+    "Faculty of Science, Chulalongkorn University, Bangkok, Thailand",
+    "School of Medicine, University of Leeds, Leeds, UK",
+] * 5
+FORK = mp.get_context("fork")
+parse_chunk = parallel._parse_chunk
+
+
+def _die_once(affil_texts, fields):
+    # the first worker to get here dies, as if it was killed
+    try:
+        os.close(os.open(os.environ["DIE_ONCE_FLAG"], os.O_CREAT | os.O_EXCL))
+    except FileExistsError:
+        return parse_chunk(affil_texts, fields)
+    os._exit(1)
+
+
+def _always_die(affil_texts, fields):
+    os._exit(1)
+
+
+def test_chunks_bounded_by_characters_and_size():
+    chunks = list(iter_chunks(["a" * 10] * 7, chunk_chars=25, max_chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 2, 1]
+    assert list(iter_chunks(["a" * 30, "b"], chunk_chars=25)) == [["a" * 30], ["b"]]
+
+
+def test_results_in_input_order():
+    with ParallelParser(workers=2, max_chunk_size=3, mp_context=FORK) as parser:
+        results = parser.map(TEXTS)
+        unordered = dict(parser.imap(TEXTS, ordered=False))
+    expected = [parse_affil(text) for text in TEXTS]
+    assert results == expected
+    assert [unordered[i] for i in range(len(TEXTS))] == expected
+
+
+def test_dead_worker_chunks_are_retried(monkeypatch, tmp_path):
+    monkeypatch.setenv("DIE_ONCE_FLAG", str(tmp_path / "died"))
+    monkeypatch.setattr(parallel, "_parse_chunk", _die_once)
+    with ParallelParser(workers=2, max_chunk_size=3, mp_context=FORK) as parser:
+        assert parser.map(TEXTS) == [parse_affil(text) for text in TEXTS]
+        assert parser.restarts >= 1
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(parallel, "_parse_chunk", _always_die)
+    with ParallelParser(workers=1, max_retries=1, mp_context=FORK) as parser:
+        with pytest.raises(BrokenProcessPool):
+            parser.map(TEXTS)
+        assert parser.restarts == 2
+
+
+def test_spawned_workers_get_runtime_config():
+    texts = ["Harvard Medical School, Boston, MA, USA, " * 10, "Mayo Clinic, Rochester, MN, India"]
+    set_work_budget(max_length=100)
+    set_location_priority("last")
+    expected = [parse_affil(text) for text in texts]
+    assert expected[0].truncated
+    with ParallelParser(workers=1, mp_context=mp.get_context("spawn")) as parser:
+        assert parser.map(texts) == expected
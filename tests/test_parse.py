@@ -0,0 +1,15 @@
+from affiliation_parser import parse_affil
+
+
+def test_fields_projection():
+    result = parse_affil("Mayo Clinic, Rochester, MN. a@b.org", fields=["email", "country"])
+    assert dict(result) == {"email": "a@b.org", "country": "united states of america"}
+
+
+def test_us_state_from_abbreviation_after_city():
+    for text, state in [
+        ("Department of Medicine, Georgetown University, Washington, DC 20057, USA", "DC"),
+        ("Saint Luke's Hospital, Kansas City, MO 64108", "MO"),
+        ("Indiana University of Pennsylvania, Indiana, PA 15705", "PA"),
+    ]:
+        assert parse_affil(text)["us_state"] == state
@@ -0,0 +1,32 @@
+import copy
+import json
+import pickle
+
+import pytest
+
+from affiliation_parser import parse_affil
+from affiliation_parser.result import FIELDS, ParsedAffiliation
+
+
+def test_behaves_like_dict():
+    result = parse_affil("Department of Medicine, Harvard Medical School, Boston, MA 02115, USA")
+    assert list(result) == list(FIELDS)
+    assert result == result.to_dict()
+    result["score"] = 0.9
+    assert result.pop("score") == 0.9
+    assert result.get("missing") is None
+    assert result.setdefault("grid_id", "grid.1") == "grid.1"
+    del result["email"]
+    assert "email" not in result
+    with pytest.raises(KeyError):
+        result["email"]
+    assert json.loads(json.dumps(result.to_dict()))["grid_id"] == "grid.1"
+
+
+def test_copies_and_pickles_are_independent():
+    result = ParsedAffiliation(country="france", institution=["X"])
+    result.truncated = True
+    for other in (result.copy(), copy.copy(result), pickle.loads(pickle.dumps(result))):
+        assert other == result and other.truncated
+        other["country"] = "italy"
+        assert result["country"] == "france"
@@ -0,0 +1,17 @@
+from affiliation_parser import parse
+from affiliation_parser.shared import SharedData
+
+
+def test_shared_tables_give_same_results():
+    texts = [
+        "Department of Medicine, Harvard Medical School, Boston, MA 02115, USA",
+        "Dept of X, Some Hospital, Springfield, Illinois",
+        "Kaiser Permanente, Oakland, CA 94612",
+    ]
+    expected = [parse.parse_affil(text) for text in texts]
+    with SharedData() as shared:
+        parse.use_shared_data(shared.artifact)
+        try:
+            assert [parse.parse_affil(text) for text in texts] == expected
+        finally:
+            parse.use_shared_data(None)
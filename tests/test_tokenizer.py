@@ -0,0 +1,38 @@
+from affiliation_parser.tokenizer import EMAIL, SEGMENT, SEPARATOR, ZIPCODE, Span, _cut, tokenize_affil
+
+
+def test_cut_removes_spans_inside_range():
+    text = "abc XYZ def UVW ghi"
+    removed = [Span(EMAIL, 4, 7), Span(ZIPCODE, 12, 15)]
+    assert _cut(text, 0, len(text), removed) == "abc  def  ghi"
+    assert _cut(text, 8, 11, removed) == "def"
+    assert _cut(text, 2, 14, removed) == "c  def "
+
+
+def test_email_with_dot_and_plus_is_removed():
+    text = "Dept of X, Univ of Y, Sao Paulo, Brazil. joao.silva+pub@usp.br"
+    tokens = tokenize_affil(text)
+    assert tokens.email == "joao.silva+pub@usp.br"
+    assert "@" not in tokens.full_text
+    assert tokens.segments == ["Dept of X", "Univ of Y", "Sao Paulo", "Brazil. "]
+
+
+def test_spans_cover_text_in_order():
+    text = "Kochi Women's University, Kochi 780-8515, Japan. w@kochi-wu.ac.jp"
+    tokens = tokenize_affil(text)
+    assert tokens.zipcode == "780-8515"
+    kinds = [span.kind for span in tokens.spans]
+    assert kinds.count(SEPARATOR) == 2 and ZIPCODE in kinds and EMAIL in kinds
+    for span in tokens.spans:
+        if span.kind == ZIPCODE:
+            assert text[span.start:span.end] == "780-8515"
+        if span.kind == SEGMENT:
+            assert "," not in text[span.start:span.end]
+    starts = [span.start for span in tokens.spans]
+    assert starts == sorted(starts)
+
+
+def test_five_digit_number_gives_us_zipcode_only():
+    tokens = tokenize_affil("Boston, MA 02114-1234, USA")
+    assert tokens.zipcode == ""
+    assert tokens.us_zipcode == "02114"
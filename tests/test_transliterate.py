@@ -0,0 +1,20 @@
+from unidecode import unidecode
+
+from affiliation_parser.transliterate import Transliterator
+
+
+def test_same_as_unidecode():
+    transliterator = Transliterator()
+    for text in ["Universität München, München", "Université Paris Descartes", "東京大学, Tokyo"]:
+        assert transliterator(text) == unidecode(text)
+
+
+def test_ascii_fast_path_and_token_cache():
+    transliterator = Transliterator(maxsize=8)
+    assert transliterator("Boston, MA") == "Boston, MA"
+    transliterator("München München")
+    stats = transliterator.stats()
+    assert stats["ascii"] == 1
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    transliterator.clear()
+    assert transliterator.stats()["size"] == 0
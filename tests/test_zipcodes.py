@@ -0,0 +1,43 @@
+from affiliation_parser import load_zip_cities, parse, parse_affil
+from affiliation_parser.zipcodes import ZipTable
+
+
+def test_prefix_state():
+    table = ZipTable([("021", "027", "MA"), ("100", "104", "NY")])
+    assert table.state("02115") == "MA"
+    assert table.state("02115-1234") == "MA"
+    assert table.state("0211") == "" and table.state("abcde") == ""
+    assert table.state("99999") == ""
+
+
+def test_load_csv_and_geonames_formats(tmp_path):
+    csv_path = tmp_path / "zips.csv"
+    csv_path.write_text("zip,city\n2115,Boston\n02139,Cambridge\n")
+    geonames_path = tmp_path / "US.txt"
+    geonames_path.write_text("US\t10001\tNew York\tNew York\tNY\n")
+    table = ZipTable().load_csv(str(csv_path)).load_csv(str(geonames_path))
+    assert table.cities("02115") == frozenset(["BOSTON"])
+    assert table.cities("10001-0001") == frozenset(["NEW YORK"])
+    assert len(table) == 3
+
+
+def test_zip_code_overrides_state_named_like_a_city():
+    result = parse_affil("Georgetown University Medical Center, Washington 20057")
+    assert (result["us_state"], result["us_city"]) == ("DC", "WASHINGTON")
+    assert parse_affil("University of Washington, Seattle, Washington 98195")["us_state"] == "WA"
+    assert parse_affil("Cleveland Clinic, Cleveland, Ohio 12206, USA")["us_state"] == "OH"
+
+
+def test_zip_code_settles_state(tmp_path):
+    assert parse_affil("Harvard Medical School, Boston 02115, USA")["us_state"] == "MA"
+    path = tmp_path / "zips.csv"
+    path.write_text("zip,city\n02115,Boston\n")
+    original = parse.ZIP_TABLE.zip_cities
+    try:
+        load_zip_cities(str(path))
+        assert parse.config_fingerprint()
+        assert parse_affil("Harvard Medical School, Boston 02115, USA")["us_city"] == "BOSTON"
+    finally:
+        parse.ZIP_TABLE.zip_cities = original
+        parse.CONFIG_CHANGES[:] = [c for c in parse.CONFIG_CHANGES if c[0] != "zip_cities"]
+        parse.config_changed()